@@ -0,0 +1,98 @@
+"""
+Authors: Mateusz Budzyński, Igor Gutowski
+
+Nodes-per-second benchmark of the class-1 game representations.
+
+Compares the original games (numbers.py, race.py - Negamax deep-copies the game at every
+node) with the compact ones (compact.py - packed int state with unmake_move) using plain
+easyAI Negamax at depths 8-16. A search that runs longer than --max-seconds is stopped and
+the nodes searched so far are used.
+
+Usage:
+    python benchmark.py
+    python benchmark.py --depths 8 10 12 --max-seconds 2
+"""
+
+import argparse
+import time
+
+from easyAI import Negamax
+
+from compact import CompactNumberRace, CompactTurnBasedGame
+from numbers import NumberRace
+from race import TurnBasedGame
+from search import SearchTimeout
+
+
+def counting(game_class, counter, deadline):
+    """
+    Make a subclass of the game that counts searched nodes and stops the search after the deadline.
+
+    Parameters:
+        game_class (type): Game class to wrap.
+        counter (list): One-element list incremented for every move made.
+        deadline (list): One-element list with the time.perf_counter() value to stop at.
+
+    Returns:
+        type: Subclass of game_class.
+    """
+    def make_move(self, move):
+        counter[0] += 1
+        if counter[0] & 0xFFF == 0 and time.perf_counter() > deadline[0]:
+            raise SearchTimeout()
+        game_class.make_move(self, move)
+
+    namespace = {"make_move": make_move}
+    if "__slots__" in game_class.__dict__:
+        namespace["__slots__"] = ()
+    return type(game_class.__name__, (game_class,), namespace)
+
+
+def nodes_per_second(game_class, depth, max_seconds):
+    """
+    Run one Negamax search from the starting position.
+
+    Parameters:
+        game_class (type): Game class to search.
+        depth (int): Search depth.
+        max_seconds (float): Time budget of the search.
+
+    Returns:
+        tuple: (nodes searched, seconds, whether the search finished).
+    """
+    counter, deadline = [0], [0.0]
+    game = counting(game_class, counter, deadline)()
+    ai = Negamax(depth)
+    start = time.perf_counter()
+    deadline[0] = start + max_seconds
+    try:
+        ai(game)
+        finished = True
+    except SearchTimeout:
+        finished = False
+    return counter[0], time.perf_counter() - start, finished
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare nodes per second of the class-1 game representations.")
+    parser.add_argument("--depths", type=int, nargs="+", default=[8, 10, 12, 14, 16])
+    parser.add_argument("--max-seconds", type=float, default=5.0, help="Time budget of a single search")
+    args = parser.parse_args()
+
+    pairs = [(NumberRace, CompactNumberRace), (TurnBasedGame, CompactTurnBasedGame)]
+    print(f"{'game':<22}{'depth':>6}{'nodes':>12}{'seconds':>10}{'nodes/s':>12}{'speedup':>9}")
+    for original, compact in pairs:
+        for depth in args.depths:
+            baseline = None
+            for game_class in (original, compact):
+                nodes, seconds, finished = nodes_per_second(game_class, depth, args.max_seconds)
+                rate = nodes / seconds if seconds else 0.0
+                speedup = f"{rate / baseline:.1f}x" if baseline else ""
+                baseline = baseline or rate
+                mark = "" if finished else "*"
+                print(f"{game_class.__name__:<22}{depth:>6}{nodes:>12}{seconds:>9.2f}{mark:1}{rate:>12.0f}{speedup:>9}")
+    print("* search stopped after --max-seconds")
+
+
+if __name__ == "__main__":
+    main()
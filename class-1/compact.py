@@ -0,0 +1,196 @@
+"""
+Authors: Mateusz Budzyński, Igor Gutowski
+
+Compact versions of the class-1 games for fast search.
+
+The whole game state (positions and the current player) is packed into one int and the
+classes support ``unmake_move``, so easyAI's Negamax plays and undoes moves on a single
+object instead of deep-copying the game at every node. The previous states are kept on
+a stack of ints, so a move allocates no lists.
+
+The rules, scoring and ``ttentry()`` keys are the same as in numbers.py and race.py, so
+the compact games work with ``TTNegamax`` and ``SolvedTable`` as well.
+"""
+
+from easyAI import TwoPlayerGame
+
+
+class CompactNumberRace(TwoPlayerGame):
+    """
+    NumberRace with the state packed into one int: ``current_number << 1 | (current_player - 1)``.
+
+    Attributes:
+        players (list): A list of players in the game.
+        target (int): The target number the players aim to reach.
+        state (int): Packed game state.
+        undo (list): Stack of previous states used by unmake_move.
+    """
+
+    __slots__ = ("players", "target", "state", "undo")
+
+    def __init__(self, players=None, target=100):
+        """
+        Initialize the CompactNumberRace instance.
+
+        Parameters:
+            players (list): A list of players in the game.
+            target (int): The target number the players aim to reach.
+        """
+        self.players = players
+        self.target = target
+        self.state = 0  # Number 0, player 1 starts
+        self.undo = []
+
+    @property
+    def current_player(self):
+        """The current player's turn (1 or 2)."""
+        return (self.state & 1) + 1
+
+    @current_player.setter
+    def current_player(self, player):
+        self.state = self.state & ~1 | (player - 1)
+
+    @property
+    def current_number(self):
+        """Current number that players add to."""
+        return self.state >> 1
+
+    def switch_player(self):
+        """Give the turn to the other player."""
+        self.state ^= 1
+
+    def possible_moves(self):
+        """Get a list of possible moves for the current player (easyAI may reorder it, so it's a new list)."""
+        return [1, 2, 3, 4, 5]
+
+    def make_move(self, move):
+        """Add the move to the current number."""
+        self.undo.append(self.state)
+        self.state += move << 1
+
+    def unmake_move(self, move):
+        """Restore the state from before the last move."""
+        self.state = self.undo.pop()
+
+    def win(self):
+        """Check if the current number reached the target."""
+        return self.state >> 1 >= self.target
+
+    def is_over(self):
+        """Check if the game is over."""
+        return self.state >> 1 >= self.target
+
+    def scoring(self):
+        """Assign a score to the current game state, same as NumberRace.scoring."""
+        if self.state >> 1 >= self.target:
+            return -100 if self.state & 1 else 100
+        return 0
+
+    def ttentry(self):
+        """Get the transposition table key, same as NumberRace.ttentry."""
+        return self.target << 17 | self.state
+
+    def show(self):
+        """Display the current state of the game."""
+        number = self.state >> 1
+        print(f"{number * '*'}{(self.target - number) * ' '} {number} / {self.target}")
+
+
+class CompactTurnBasedGame(TwoPlayerGame):
+    """
+    TurnBasedGame with the state packed into one int:
+    ``(p1 position * base + p2 position) << 1 | (current_player - 1)``, where ``base = num_fields + 3``.
+
+    Attributes:
+        players (list): A list of players in the game.
+        num_fields (int): The total number of fields in the game.
+        base (int): Base used to pack the positions (positions can overshoot the last field by up to 2).
+        state (int): Packed game state.
+        undo (list): Stack of previous states used by unmake_move.
+    """
+
+    __slots__ = ("players", "num_fields", "base", "state", "undo")
+
+    def __init__(self, players=None, num_fields=20):
+        """
+        Initialize the CompactTurnBasedGame instance.
+
+        Parameters:
+            players (list): A list of players in the game.
+            num_fields (int): The total number of fields in the game.
+        """
+        self.players = players
+        self.num_fields = num_fields
+        self.base = num_fields + 3
+        self.state = 0  # Both players at the start, player 1 starts
+        self.undo = []
+
+    @property
+    def current_player(self):
+        """The current player's turn (1 or 2)."""
+        return (self.state & 1) + 1
+
+    @current_player.setter
+    def current_player(self, player):
+        self.state = self.state & ~1 | (player - 1)
+
+    @property
+    def players_position(self):
+        """Current positions of the players on the field."""
+        return list(divmod(self.state >> 1, self.base))
+
+    def switch_player(self):
+        """Give the turn to the other player."""
+        self.state ^= 1
+
+    def possible_moves(self):
+        """Get a list of possible moves for the current player (easyAI may reorder it, so it's a new list)."""
+        return [1, 2, 3]
+
+    def make_move(self, move):
+        """
+        Move the current player, a player landing on the opponent sends them back to the start.
+
+        Parameters:
+            move (int): The move made by the current player.
+        """
+        state = self.state
+        self.undo.append(state)
+        p1, p2 = divmod(state >> 1, self.base)
+        if state & 1:
+            p2 += move
+            if p2 == p1:
+                p1 = 0
+        else:
+            p1 += move
+            if p1 == p2:
+                p2 = 0
+        self.state = (p1 * self.base + p2) << 1 | (state & 1)
+
+    def unmake_move(self, move):
+        """Restore the state from before the last move."""
+        self.state = self.undo.pop()
+
+    def win(self):
+        """Check if the current player has won the game."""
+        p1, p2 = divmod(self.state >> 1, self.base)
+        return (p2 if self.state & 1 else p1) >= self.num_fields
+
+    def is_over(self):
+        """Check if the game is over."""
+        p1, p2 = divmod(self.state >> 1, self.base)
+        return p1 >= self.num_fields or p2 >= self.num_fields
+
+    def scoring(self):
+        """Assign a score to the current game state, same as TurnBasedGame.scoring."""
+        return 1 if self.win() else -1
+
+    def ttentry(self):
+        """Get the transposition table key, same as TurnBasedGame.ttentry."""
+        return self.num_fields << 17 | self.state
+
+    def show(self):
+        """Display the current state of the game."""
+        p1, p2 = divmod(self.state >> 1, self.base)
+        print(f'p1 position: {p1 * "#"}> {p1}/{self.num_fields}')
+        print(f'p2 position: {p2 * "#"}> {p2}/{self.num_fields}')
@@ -1,4 +1,6 @@
-from easyAI import TwoPlayerGame, Negamax, Human_Player, AI_Player
+from easyAI import TwoPlayerGame, Human_Player, AI_Player
+
+from search import TTNegamax
 
 """
 Rules and instructions: README.md
@@ -51,10 +53,20 @@ class NumberRace(TwoPlayerGame):
             return 100 if self.current_player == 1 else -100  # Assign score based on the winner
         return 0  # If the game is not over, return a neutral score
 
+    def ttentry(self):
+        """
+        Get a compact description of the game state for the transposition table.
+
+        Returns:
+            int: Target, current number and current player packed into one int.
+        """
+        return (self.target << 16 | self.current_number) << 1 | (self.current_player - 1)
+
     def show(self):
         """Display the current state of the game."""
         print(f"{self.current_number * '*'}{(self.target - self.current_number) * ' '} {self.current_number} / {self.target}")
 
-ai = Negamax(10)  # The AI will think 10 moves in advance
-game = NumberRace([AI_Player(ai), Human_Player()], target=40)
-history = game.play()
\ No newline at end of file
+if __name__ == "__main__":
+    ai = TTNegamax(20)  # The AI will think 20 moves in advance, known positions come from the transposition table
+    game = NumberRace([AI_Player(ai), Human_Player()], target=40)
+    history = game.play()
@@ -1,4 +1,6 @@
-from easyAI import TwoPlayerGame, Negamax, Human_Player, AI_Player
+from easyAI import TwoPlayerGame, Human_Player, AI_Player
+
+from search import TTNegamax
 # import random
 
 """
@@ -24,6 +26,7 @@ class TurnBasedGame(TwoPlayerGame):
         win(): Check if the current player has won the game.
         is_over(): Check if the game is over.
         scoring(): Assign a score to the current game state based on the quality of the move for the AI player.
+        ttentry(): Get a compact description of the game state for the transposition table.
         show(): Display the current state of the game.
     """
 
@@ -94,6 +97,17 @@ class TurnBasedGame(TwoPlayerGame):
         """
         return 1 if self.win() else -1
 
+    def ttentry(self):
+        """
+        Get a compact description of the game state for the transposition table.
+
+        Returns:
+            int: Board size, both positions and the current player packed into one int.
+        """
+        base = self.num_fields + 3  # Positions can overshoot the last field by up to 2
+        positions = self.players_position[0] * base + self.players_position[1]
+        return (self.num_fields << 16 | positions) << 1 | (self.current_player - 1)
+
     def show(self):
         """
         Display the current state of the game.
@@ -101,6 +115,7 @@ class TurnBasedGame(TwoPlayerGame):
         print(f'p1 position: {self.players_position[0] * "#"}> {self.players_position[0]}/{self.num_fields}')
         print(f'p2 position: {self.players_position[1] * "#"}> {self.players_position[1]}/{self.num_fields}')
 
-ai = Negamax(12)  # The AI will think 12 moves in advance
-game = TurnBasedGame([AI_Player(ai), Human_Player()])
-history = game.play()
\ No newline at end of file
+if __name__ == "__main__":
+    ai = TTNegamax(20)  # The AI will think 20 moves in advance, known positions come from the transposition table
+    game = TurnBasedGame([AI_Player(ai), Human_Player()])
+    history = game.play()
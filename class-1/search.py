@@ -0,0 +1,339 @@
+"""
+Authors: Mateusz Budzyński, Igor Gutowski
+
+Shared search engine for the class-1 games (NumberRace, TurnBasedGame).
+
+Both games have tiny state spaces, so plain Negamax keeps re-searching the same
+positions. This module adds a bounded transposition table that plugs into easyAI's
+Negamax (it implements the same ``lookup``/``store`` interface as
+``easyAI.TranspositionTable``), a small Negamax wrapper that uses it and an
+iterative-deepening AI that searches within a wall-clock budget.
+
+Games used with this engine must expose ``ttentry()`` returning a compact, hashable
+description of the state (the class-1 games return a single int).
+"""
+
+import time
+
+from easyAI import Negamax
+from easyAI.AI.Negamax import EXACT, LOWERBOUND, UPPERBOUND
+
+inf = float("infinity")
+
+
+class BoundedTranspositionTable:
+    """
+    Fixed-size transposition table with a depth-preferred replacement policy.
+
+    Every state key is mapped to one slot (``hash(key) % size``). A slot stores the full key,
+    the search depth, the bound type (flag), the value and the best move. An existing entry
+    is replaced when:
+        - the slot holds the same state,
+        - the stored entry comes from an older search (see ``new_search``),
+        - or the new entry was searched at least as deep as the stored one.
+
+    Attributes:
+        size (int): Number of slots in the table.
+        generation (int): Counter of searches, used to age out old entries.
+        hits (int): Number of successful lookups.
+        stores (int): Number of entries written.
+        collisions (int): Number of stores rejected by the replacement policy.
+    """
+
+    def __init__(self, size=1 << 16):
+        """
+        Initialize the table.
+
+        Parameters:
+            size (int): Number of slots in the table.
+        """
+        self.size = size
+        self.generation = 0
+        self.hits = 0
+        self.stores = 0
+        self.collisions = 0
+        self.slots = [None] * size
+
+    def new_search(self):
+        """Mark the start of a new search, entries from older searches become replaceable."""
+        self.generation += 1
+
+    def clear(self):
+        """Remove all entries from the table."""
+        self.slots = [None] * self.size
+        self.generation = 0
+
+    def lookup(self, game):
+        """
+        Get the entry stored for the given game state.
+
+        Parameters:
+            game (TwoPlayerGame): Game exposing ``ttentry()``.
+
+        Returns:
+            dict: Entry with keys depth, flag, value and move, or None if the state is not stored.
+        """
+        key = game.ttentry()
+        slot = self.slots[hash(key) % self.size]
+        if slot is None or slot[0] != key:
+            return None
+        self.hits += 1
+        return slot[2]
+
+    def store(self, game, depth, value, move, flag):
+        """
+        Store the search result for the given game state (called by easyAI's negamax).
+
+        Parameters:
+            game (TwoPlayerGame): Game exposing ``ttentry()``.
+            depth (int): Remaining search depth the value was computed with.
+            value (float): Value of the state for the player to move.
+            move: Best move found in the state.
+            flag (int): Bound type (easyAI LOWERBOUND, EXACT or UPPERBOUND).
+        """
+        key = game.ttentry()
+        index = hash(key) % self.size
+        slot = self.slots[index]
+        if (
+            slot is not None
+            and slot[0] != key
+            and slot[1] == self.generation
+            and slot[2]["depth"] > depth
+        ):
+            self.collisions += 1
+            return
+        self.slots[index] = (
+            key,
+            self.generation,
+            {"depth": depth, "flag": flag, "value": value, "move": move},
+        )
+        self.stores += 1
+
+    def __deepcopy__(self, memo):
+        """
+        Share the table instead of copying it.
+
+        easyAI's negamax deep-copies the game at every node and the game holds the players,
+        so without this the whole table would be copied together with the AI.
+        """
+        return self
+
+    def __len__(self):
+        """Number of occupied slots."""
+        return sum(slot is not None for slot in self.slots)
+
+
+class TTNegamax(Negamax):
+    """
+    easyAI Negamax backed by a ``BoundedTranspositionTable``.
+
+    The table is kept between moves, so positions searched for the previous move are reused.
+    With it, depth 20+ searches on the class-1 games return interactively.
+    """
+
+    def __init__(self, depth, scoring=None, win_score=+float("inf"), tt_size=1 << 16):
+        """
+        Initialize the AI.
+
+        Parameters:
+            depth (int): How many moves in advance the AI thinks.
+            scoring (callable): Optional scoring function, game.scoring() is used by default.
+            win_score (float): Score above which the score means a win.
+            tt_size (int): Number of slots in the transposition table.
+        """
+        super().__init__(depth, scoring, win_score, tt=BoundedTranspositionTable(tt_size))
+
+    def __call__(self, game):
+        """Return the AI's best move for the current state of the game."""
+        self.tt.new_search()
+        return super().__call__(game)
+
+
+class SearchTimeout(Exception):
+    """Raised inside the search when the time budget is used up."""
+
+
+class IterativeDeepening:
+    """
+    Negamax with iterative deepening and a wall-clock budget.
+
+    The AI searches depth 1, 2, 3, ... until the budget runs out and plays the best move of the
+    last completed depth. Moves are ordered by:
+        - the best move from the transposition table (the principal variation of the previous depth),
+        - killer moves - up to two moves per ply that caused a cutoff,
+        - the history heuristic - moves that often caused cutoffs, weighted by depth squared.
+
+    Scores are computed like in easyAI's Negamax, so both AIs play the same way at the same depth.
+
+    Attributes:
+        budget_ms (float): Time budget of one move in milliseconds.
+        max_depth (int): Deepest search that is started.
+        depth (int): Depth reached for the last move.
+        nodes (int): Nodes searched for the last move.
+        elapsed_ms (float): Time spent on the last move in milliseconds.
+        verbose (bool): Print depth, nodes and time after every move.
+    """
+
+    def __init__(self, budget_ms=200, max_depth=50, scoring=None, tt_size=1 << 16, verbose=False):
+        """
+        Initialize the AI.
+
+        Parameters:
+            budget_ms (float): Time budget of one move in milliseconds.
+            max_depth (int): Deepest search that is started.
+            scoring (callable): Optional scoring function, game.scoring() is used by default.
+            tt_size (int): Number of slots in the transposition table.
+            verbose (bool): Print depth, nodes and time after every move.
+        """
+        self.budget_ms = budget_ms
+        self.max_depth = max_depth
+        self.scoring = scoring
+        self.tt = BoundedTranspositionTable(tt_size)
+        self.verbose = verbose
+        self.killers = {}
+        self.history = {}
+        self.depth = 0
+        self.nodes = 0
+        self.elapsed_ms = 0.0
+
+    def __call__(self, game):
+        """
+        Return the best move found within the time budget.
+
+        Parameters:
+            game (TwoPlayerGame): Current state of the game, it is not modified.
+
+        Returns:
+            The best move of the deepest completed search.
+        """
+        start = time.perf_counter()
+        self.deadline = start + self.budget_ms / 1000
+        self.score = self.scoring if self.scoring else (lambda g: g.scoring())
+        self.tt.new_search()
+        self.killers = {}
+        self.history = {move: count // 2 for move, count in self.history.items()}  # Age the history
+        self.nodes = 0
+        self.depth = 0
+
+        root = game.copy()  # A timeout can stop the search between make_move and unmake_move
+        best_move = game.possible_moves()[0]
+        for depth in range(1, self.max_depth + 1):
+            try:
+                _, move = self.negamax(root, depth, 0, -inf, inf)
+            except SearchTimeout:
+                break
+            best_move, self.depth = move, depth
+
+        self.elapsed_ms = (time.perf_counter() - start) * 1000
+        if self.verbose:
+            print(f"AI: depth {self.depth}, {self.nodes} nodes, {self.elapsed_ms:.0f} ms")
+        return best_move
+
+    def negamax(self, game, depth, ply, alpha, beta):
+        """
+        Alpha-beta negamax with the transposition table and move ordering.
+
+        Parameters:
+            game (TwoPlayerGame): Game to search.
+            depth (int): Remaining search depth.
+            ply (int): Distance from the root, used for killer moves.
+            alpha (float): Lower bound of the search window.
+            beta (float): Upper bound of the search window.
+
+        Returns:
+            tuple: (value for the player to move, best move or None at a leaf).
+        """
+        self.nodes += 1
+        if self.nodes & 0x3FF == 0 and time.perf_counter() > self.deadline:
+            raise SearchTimeout()
+
+        alpha_orig = alpha
+        entry = self.tt.lookup(game)
+        tt_move = None
+        if entry is not None:
+            tt_move = entry["move"]
+            if entry["depth"] >= depth:
+                flag, value = entry["flag"], entry["value"]
+                if flag == EXACT:
+                    return value, tt_move
+                if flag == LOWERBOUND:
+                    alpha = max(alpha, value)
+                elif flag == UPPERBOUND:
+                    beta = min(beta, value)
+                if alpha >= beta:
+                    return value, tt_move
+
+        if depth == 0 or game.is_over():
+            # Same bonus as easyAI: quick wins and slow defeats are preferred
+            return self.score(game) * (1 + 0.001 * depth), None
+
+        moves = self.order_moves(game.possible_moves(), tt_move, ply)
+        best_value, best_move = -inf, moves[0]
+        unmake_move = hasattr(game, "unmake_move")
+        for move in moves:
+            child = game if unmake_move else game.copy()
+            child.make_move(move)
+            child.switch_player()
+            value = -self.negamax(child, depth - 1, ply + 1, -beta, -alpha)[0]
+            if unmake_move:
+                game.switch_player()
+                game.unmake_move(move)
+
+            if value > best_value:
+                best_value, best_move = value, move
+            if value > alpha:
+                alpha = value
+            if alpha >= beta:
+                self.store_cutoff(move, depth, ply)
+                break
+
+        if best_value <= alpha_orig:
+            flag = UPPERBOUND
+        elif best_value >= beta:
+            flag = LOWERBOUND
+        else:
+            flag = EXACT
+        self.tt.store(game, depth, best_value, best_move, flag)
+        return best_value, best_move
+
+    def order_moves(self, moves, tt_move, ply):
+        """
+        Order moves: transposition table move, killer moves, then by history score.
+
+        Parameters:
+            moves (list): Possible moves.
+            tt_move: Best move stored in the transposition table, or None.
+            ply (int): Distance from the root.
+
+        Returns:
+            list: Ordered moves.
+        """
+        killers = self.killers.get(ply, ())
+        history = self.history
+
+        def priority(move):
+            if move == tt_move:
+                return 0, 0
+            if move in killers:
+                return 1, 0
+            return 2, -history.get(move, 0)
+
+        return sorted(moves, key=priority)
+
+    def store_cutoff(self, move, depth, ply):
+        """
+        Remember a move that caused a beta cutoff as a killer move and in the history table.
+
+        Parameters:
+            move: Move that caused the cutoff.
+            depth (int): Remaining search depth.
+            ply (int): Distance from the root.
+        """
+        killers = self.killers.get(ply, ())
+        if move not in killers:
+            self.killers[ply] = (move,) + killers[:1]
+        self.history[move] = self.history.get(move, 0) + depth * depth
+
+    def __deepcopy__(self, memo):
+        """Share the AI, easyAI deep-copies the game (and its players) when it copies the game."""
+        return self
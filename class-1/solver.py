@@ -0,0 +1,242 @@
+"""
+Authors: Mateusz Budzyński, Igor Gutowski
+
+Exact retrograde solver for the class-1 games (NumberRace, TurnBasedGame).
+
+Both games are small enough to be solved completely. The solver goes backwards from the
+final positions and marks every state as a win, a loss or a draw for the player to move:
+    - a state is a win if some move reaches the target or leads to a lost state,
+    - a state is a loss if every move leads to a won state,
+    - a state that is never resolved is a draw - both players can keep the game looping
+      forever (the capture loop described in README.md for race.py).
+
+The table stores one byte per state (outcome and best move) and is saved to a raw binary
+file with a small header, so it can be memory-mapped and queried in O(1).
+
+Usage:
+    python solver.py numbers --target 40
+    python solver.py race --fields 20
+"""
+
+import argparse
+import mmap
+import struct
+from collections import deque
+
+DRAW, WIN, LOSS = 0, 1, 2
+OUTCOME_NAMES = {DRAW: "draw", WIN: "win", LOSS: "loss"}
+
+NUMBERS, RACE = 0, 1
+HEADER = struct.Struct("<4sBHHI")  # magic, game kind, target / number of fields, max move, number of states
+MAGIC = b"C1RT"
+
+
+def solve(num_states, moves, successor):
+    """
+    Solve a game graph by backward induction.
+
+    Parameters:
+        num_states (int): Number of non-terminal states, states are numbered from 0.
+        moves (list): Moves available in every state.
+        successor (callable): successor(state, move) -> next state index, or None if the move ends the game
+            (the player who made it wins).
+
+    Returns:
+        bytearray: One byte per state, ``outcome << 4 | best move``.
+    """
+    outcome = bytearray(num_states)
+    distance = [0] * num_states  # Number of moves until the end of the game
+    best_move = [moves[0]] * num_states
+    remaining = [len(moves)] * num_states  # Successors not yet known to be won by the opponent
+    predecessors = [[] for _ in range(num_states)]
+    queue = deque()
+
+    for state in range(num_states):
+        for move in moves:
+            next_state = successor(state, move)
+            if next_state is None:
+                if outcome[state] != WIN:
+                    outcome[state], distance[state], best_move[state] = WIN, 1, move
+                    queue.append(state)
+            else:
+                predecessors[next_state].append((state, move))
+
+    while queue:
+        state = queue.popleft()
+        for previous, move in predecessors[state]:
+            if outcome[previous] != DRAW:
+                continue
+            if outcome[state] == LOSS:
+                # The queue is ordered by distance, so the first lost successor is the fastest win
+                outcome[previous], distance[previous], best_move[previous] = WIN, distance[state] + 1, move
+                queue.append(previous)
+            else:
+                remaining[previous] -= 1
+                # The last won successor is the slowest way to lose
+                if remaining[previous] == 0:
+                    outcome[previous], distance[previous], best_move[previous] = LOSS, distance[state] + 1, move
+                    queue.append(previous)
+
+    for state in range(num_states):
+        if outcome[state] == DRAW:
+            # Keep the game looping, never step into a state the opponent wins
+            for move in moves:
+                next_state = successor(state, move)
+                if next_state is not None and outcome[next_state] == DRAW:
+                    best_move[state] = move
+                    break
+
+    return bytearray(outcome[state] << 4 | best_move[state] for state in range(num_states))
+
+
+def solve_number_race(target=100, moves=range(1, 6)):
+    """
+    Solve NumberRace. The state is the current number (0 .. target - 1).
+
+    Parameters:
+        target (int): The target number the players aim to reach.
+        moves (iterable): Numbers the players can add.
+
+    Returns:
+        bytearray: Solved table, see ``solve``.
+    """
+    def successor(state, move):
+        return None if state + move >= target else state + move
+
+    return solve(target, list(moves), successor)
+
+
+def solve_race(num_fields=20, moves=(1, 2, 3)):
+    """
+    Solve TurnBasedGame. The state is ``mover position * num_fields + opponent position``.
+
+    Parameters:
+        num_fields (int): The total number of fields in the game.
+        moves (iterable): Numbers of fields the players can move.
+
+    Returns:
+        bytearray: Solved table, see ``solve``.
+    """
+    def successor(state, move):
+        mover, opponent = divmod(state, num_fields)
+        mover += move
+        if mover >= num_fields:
+            return None
+        if mover == opponent:
+            opponent = 0  # Capture, the opponent goes back to the start
+        return opponent * num_fields + mover  # The opponent moves next
+
+    return solve(num_fields * num_fields, list(moves), successor)
+
+
+def save_table(path, kind, size, max_move, table):
+    """
+    Save a solved table as a raw binary file: header followed by one byte per state.
+
+    Parameters:
+        path (str): Output file.
+        kind (int): NUMBERS or RACE.
+        size (int): Target number or number of fields.
+        max_move (int): Largest move allowed.
+        table (bytearray): Solved table.
+    """
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, kind, size, max_move, len(table)))
+        f.write(table)
+
+
+class SolvedTable:
+    """
+    Memory-mapped solved table that can be used as an AI algorithm: ``AI_Player(SolvedTable(path))``.
+
+    Every move is a single table lookup, so the AI answers in constant time for any target or board size.
+
+    Attributes:
+        kind (int): NUMBERS or RACE.
+        size (int): Target number or number of fields the table was solved for.
+        max_move (int): Largest move allowed.
+        num_states (int): Number of states in the table.
+    """
+
+    def __init__(self, path):
+        """
+        Open a table saved with ``save_table``.
+
+        Parameters:
+            path (str): Table file.
+        """
+        with open(path, "rb") as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.kind, self.size, self.max_move, self.num_states = HEADER.unpack_from(self.data)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a solved table")
+
+    def state_index(self, game):
+        """
+        Get the table index of the game state.
+
+        Parameters:
+            game (TwoPlayerGame): NumberRace or TurnBasedGame matching the table.
+
+        Returns:
+            int: Index of the state in the table.
+        """
+        if self.kind == NUMBERS:
+            if game.target != self.size:
+                raise ValueError(f"Table solved for target {self.size}, game target is {game.target}")
+            return game.current_number
+        if game.num_fields != self.size:
+            raise ValueError(f"Table solved for {self.size} fields, game has {game.num_fields}")
+        mover = game.current_player - 1
+        return game.players_position[mover] * self.size + game.players_position[1 - mover]
+
+    def lookup(self, game):
+        """
+        Get the solved entry of the game state.
+
+        Parameters:
+            game (TwoPlayerGame): NumberRace or TurnBasedGame matching the table.
+
+        Returns:
+            tuple: (outcome for the player to move, best move).
+        """
+        entry = self.data[HEADER.size + self.state_index(game)]
+        return entry >> 4, entry & 0x0F
+
+    def outcome(self, game):
+        """Get the outcome (WIN, LOSS or DRAW) of the game state for the player to move."""
+        return self.lookup(game)[0]
+
+    def __call__(self, game):
+        """Return the best move for the current state of the game."""
+        return self.lookup(game)[1]
+
+    def __deepcopy__(self, memo):
+        """Share the mapped table, easyAI deep-copies the game (and its players) in the history."""
+        return self
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Solve a class-1 game and save the table.")
+    parser.add_argument("game", choices=["numbers", "race"])
+    parser.add_argument("--target", type=int, default=100, help="NumberRace target number")
+    parser.add_argument("--fields", type=int, default=20, help="TurnBasedGame number of fields")
+    parser.add_argument("--output", help="Output file (default: <game>_<size>.table)")
+    args = parser.parse_args()
+
+    if args.game == "numbers":
+        kind, size, max_move, table = NUMBERS, args.target, 5, solve_number_race(args.target)
+    else:
+        kind, size, max_move, table = RACE, args.fields, 3, solve_race(args.fields)
+
+    path = args.output or f"{args.game}_{size}.table"
+    save_table(path, kind, size, max_move, table)
+
+    start = OUTCOME_NAMES[table[0] >> 4]
+    counts = {name: sum(1 for entry in table if entry >> 4 == value) for value, name in OUTCOME_NAMES.items()}
+    print(f"Saved {len(table)} states to {path}")
+    print(f"Starting position: {start} for player 1, states: {counts}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+"""
+Authors: Mateusz Budzyński, Igor Gutowski
+
+Tests of the headless tournament AIs.
+"""
+
+from compact import CompactNumberRace
+from search import IterativeDeepening
+from tournament import side_to_move_scoring
+
+
+def test_second_seat_takes_the_winning_move():
+    game = CompactNumberRace(target=40)
+    game.make_move(35)  # 35 / 40, player 2 to move
+    game.switch_player()
+    assert game.current_player == 2
+    ai = IterativeDeepening(float("inf"), max_depth=6, scoring=side_to_move_scoring)
+    assert ai(game) == 5
+
+
+def test_first_seat_takes_the_winning_move():
+    game = CompactNumberRace(target=40)
+    game.make_move(36)
+    ai = IterativeDeepening(float("inf"), max_depth=6, scoring=side_to_move_scoring)
+    assert ai(game) in (4, 5)
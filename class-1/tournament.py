@@ -0,0 +1,177 @@
+"""
+Authors: Mateusz Budzyński, Igor Gutowski
+
+Headless AI-vs-AI tournament for the class-1 games.
+
+Plays many games between two AIs (IterativeDeepening limited to a given depth) across a
+process pool, without ``show()`` and without the easyAI ``play()`` history. Every game
+starts with a few random moves, so games differ, and the AIs swap seats every other game.
+An opening that already ends the game (before any AI moved) is replayed with new random moves,
+up to MAX_OPENINGS times, after that the game is discarded and not written.
+The player who reaches the target (NumberRace) or the last field (TurnBasedGame) wins, a
+game that is still running after --max-moves (the race.py capture loop) is a draw. Both AIs
+score the states for the player to move (side_to_move_scoring), so neither seat is favoured.
+
+One CSV line is written as soon as a game finishes (so the lines are in finishing order):
+    game, seed, first (which AI started), winner (0 draw, 1 AI A, 2 AI B), length, nodes_a, nodes_b,
+    openings (number of random openings played)
+
+Usage:
+    python tournament.py numbers --games 2000 --depths 6 10 --target 40
+    python tournament.py race --games 2000 --depths 8 8 --fields 20 --workers 8
+"""
+
+import argparse
+import csv
+import random
+import time
+from multiprocessing import Pool
+
+from compact import CompactNumberRace, CompactTurnBasedGame
+from search import IterativeDeepening
+
+MAX_OPENINGS = 100
+
+
+def side_to_move_scoring(game):
+    """
+    Score a state for the player to move, as negamax needs it.
+
+    The scoring of NumberRace (and CompactNumberRace) is absolute - good for player 1 - so the
+    AI in the second seat would avoid winning. The player who made the last move ended the game,
+    so a finished game is lost for the player to move.
+
+    Parameters:
+        game (TwoPlayerGame): Game state.
+
+    Returns:
+        int: -100 if the game is over, 0 otherwise.
+    """
+    return -100 if game.is_over() else 0
+
+
+def play_game(args):
+    """
+    Play one headless game.
+
+    Parameters:
+        args (tuple): (game index, settings dict) - a tuple so the function can be used with Pool.imap.
+
+    Returns:
+        tuple: (game, seed, first, winner, length, nodes_a, nodes_b, openings), see the module
+        docstring, or None if every opening ended the game.
+    """
+    index, settings = args
+    seed = settings["seed"] + index
+    rng = random.Random(seed)
+
+    for openings in range(1, MAX_OPENINGS + 1):
+        if settings["game"] == "numbers":
+            game = CompactNumberRace(target=settings["target"])
+        else:
+            game = CompactTurnBasedGame(num_fields=settings["fields"])
+        length = 0
+        while not game.is_over() and length < min(settings["random_moves"], settings["max_moves"]):
+            game.make_move(rng.choice(game.possible_moves()))
+            game.switch_player()
+            length += 1
+        if not game.is_over():
+            break
+    else:
+        return None  # No AI would make a move
+
+    ais = [
+        IterativeDeepening(settings["budget_ms"], max_depth=depth, scoring=side_to_move_scoring, tt_size=settings["tt_size"])
+        for depth in settings["depths"]
+    ]
+    first = 1 + index % 2  # The AIs swap seats every other game
+    seats = ais if first == 1 else ais[::-1]
+    nodes = {id(ai): 0 for ai in ais}
+
+    while not game.is_over() and length < settings["max_moves"]:
+        ai = seats[game.current_player - 1]
+        move = ai(game)
+        nodes[id(ai)] += ai.nodes
+        game.make_move(move)
+        game.switch_player()
+        length += 1
+
+    winner = 0
+    if game.is_over():
+        last_player = game.opponent_index  # The player who made the last move
+        winner = last_player if first == 1 else 3 - last_player
+    return index, seed, first, winner, length, nodes[id(ais[0])], nodes[id(ais[1])], openings
+
+
+def run_tournament(settings, games, workers, output):
+    """
+    Play all games across a process pool and write the result of every game as soon as it finishes.
+
+    Parameters:
+        settings (dict): Game and AI settings passed to play_game.
+        games (int): Number of games.
+        workers (int): Number of processes (None - one per CPU).
+        output (str): CSV file for the per-game results.
+
+    Returns:
+        list: Per-game results in game order, without the discarded games.
+    """
+    start = time.perf_counter()
+    tasks = ((index, settings) for index in range(games))
+    results, discarded = [], 0
+    with open(output, "w", newline="") as f, Pool(workers) as pool:
+        writer = csv.writer(f)
+        writer.writerow(["game", "seed", "first", "winner", "length", "nodes_a", "nodes_b", "openings"])
+        for result in pool.imap_unordered(play_game, tasks):
+            if result is None:
+                discarded += 1
+                continue
+            writer.writerow(result)
+            f.flush()  # A stopped tournament keeps the finished games
+            results.append(result)
+    elapsed = time.perf_counter() - start
+    results.sort()
+
+    wins = [sum(1 for result in results if result[3] == winner) for winner in (1, 2, 0)]
+    nodes = sum(result[5] + result[6] for result in results)
+    depth_a, depth_b = settings["depths"]
+    print(f"{games} games in {elapsed:.1f} s ({games / elapsed:.0f} games/s, {nodes / elapsed:.0f} nodes/s)")
+    print(f"AI A (depth {depth_a}): {wins[0]} wins, AI B (depth {depth_b}): {wins[1]} wins, draws: {wins[2]}")
+    if discarded:
+        print(f"Discarded {discarded} games, every random opening ended them (lower --random-moves)")
+    print(f"Results saved to {output}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless AI-vs-AI tournament for the class-1 games.")
+    parser.add_argument("game", choices=["numbers", "race"])
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--depths", type=int, nargs=2, default=[8, 8], metavar=("A", "B"), help="Search depth of both AIs")
+    parser.add_argument("--budget-ms", type=float, default=float("inf"), help="Time budget of one move")
+    parser.add_argument("--target", type=int, default=100, help="NumberRace target number")
+    parser.add_argument("--fields", type=int, default=20, help="TurnBasedGame number of fields")
+    parser.add_argument("--random-moves", type=int, default=2, help="Random opening moves of every game")
+    parser.add_argument("--max-moves", type=int, default=200, help="Moves after which the game is a draw")
+    parser.add_argument("--tt-size", type=int, default=1 << 14, help="Transposition table slots of every AI")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None, help="Number of processes (default: one per CPU)")
+    parser.add_argument("--output", default="tournament.csv")
+    args = parser.parse_args()
+
+    settings = {
+        "game": args.game,
+        "depths": args.depths,
+        "budget_ms": args.budget_ms,
+        "target": args.target,
+        "fields": args.fields,
+        "random_moves": args.random_moves,
+        "max_moves": args.max_moves,
+        "tt_size": args.tt_size,
+        "seed": args.seed,
+    }
+    run_tournament(settings, args.games, args.workers, args.output)
+
+
+if __name__ == "__main__":
+    main()
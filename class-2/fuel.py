@@ -41,14 +41,12 @@ import skfuzzy as fuzz
 from skfuzzy import control as ctrl
 import matplotlib.pyplot as plt
 
-def calculate_average_fuel_consumption(car_weight_value, average_speed_value, power_value):
+def build_fuel_control_system():
     """
-    Function calculates average fuel consumption based on given vehicle parameters.
-    
-    :param car_weight_value: Car weight (kg)
-    :param average_speed_value: Average speed (km/h)
-    :param power_value: Vehicle power (horsepower)
-    :return: Calculated average fuel consumption (l/100km)
+    Function builds the fuzzy control system for average fuel consumption.
+
+    :return: Control system with the car_weight, average_speed and power inputs
+        and the average_fuel_consumption output
     """
 
     """
@@ -89,7 +87,20 @@ def calculate_average_fuel_consumption(car_weight_value, average_speed_value, po
     """
     Now that we have our rules defined, we can simply create a control system
     """
-    average_fuel_consumption_ctrl = ctrl.ControlSystem([rule1, rule2, rule3])
+    return ctrl.ControlSystem([rule1, rule2, rule3])
+
+
+def calculate_average_fuel_consumption(car_weight_value, average_speed_value, power_value, view=True):
+    """
+    Function calculates average fuel consumption based on given vehicle parameters.
+    
+    :param car_weight_value: Car weight (kg)
+    :param average_speed_value: Average speed (km/h)
+    :param power_value: Vehicle power (horsepower)
+    :param view: Show the membership functions of all variables for the computed result
+    :return: Calculated average fuel consumption (l/100km)
+    """
+    average_fuel_consumption_ctrl = build_fuel_control_system()
 
     """
     In order to simulate this control system, we will create a
@@ -111,21 +122,22 @@ def calculate_average_fuel_consumption(car_weight_value, average_speed_value, po
     """
     Once computed, we can view the result as well as visualize it.
     """
-    car_weight.view(sim=fuel_sim)
-    average_speed.view(sim=fuel_sim)
-    power.view(sim=fuel_sim)
-    average_fuel_consumption.view(sim=fuel_sim)
+    if view:
+        for variable in average_fuel_consumption_ctrl.fuzzy_variables:
+            variable.view(sim=fuel_sim)
 
     # Return average fuel consumption
     return fuel_sim.output['average_fuel_consumption']
 
-# Example input data
-car_weight_input = 1800
-average_speed_input = 100
-power_input = 150
 
-# Calculate average fuel consumption
-result = calculate_average_fuel_consumption(car_weight_input, average_speed_input, power_input)
-print(f"Średnie spalanie paliwa: {result:.2f}")
+if __name__ == "__main__":
+    # Example input data
+    car_weight_input = 1800
+    average_speed_input = 100
+    power_input = 150
+
+    # Calculate average fuel consumption
+    result = calculate_average_fuel_consumption(car_weight_input, average_speed_input, power_input)
+    print(f"Średnie spalanie paliwa: {result:.2f}")
 
-plt.show()  # Shows plot
+    plt.show()  # Shows plot
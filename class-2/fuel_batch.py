@@ -0,0 +1,225 @@
+"""
+
+Authors: Mateusz Budzyński, Igor Gutowski
+
+==========================================
+Batch evaluation of the fuel consumption controller
+==========================================
+``calculate_average_fuel_consumption`` from fuel.py builds the whole control system for
+every call and evaluates one (weight, speed, power) triple. ``BatchFuelController`` takes
+the control system once, turns it into dense NumPy arrays and evaluates whole arrays of
+inputs at once, without a Python loop over rows and without plotting:
+
+* Fuzzification - every input is interpolated on the membership functions of its terms
+  (the same ``np.interp`` skfuzzy uses), inputs are clipped to the universe like in
+  ``ControlSystemSimulation``.
+* Rule firing - rules are stored as a (rules x inputs) matrix of term indices, the
+  activation of a rule is the minimum (AND) of its term memberships times the rule weight.
+  Activations of the same output term are accumulated with maximum.
+* Defuzzification - centroid of the clipped output membership functions. Like skfuzzy, the
+  output universe is upsampled with the points where every term reaches its activation
+  level and the centroid is computed exactly for the piecewise linear shape, so the results
+  match ``ControlSystemSimulation`` up to float rounding.
+
+Rows where no rule fires have no centroid (skfuzzy raises an error), they return NaN.
+
+Example:
+    controller = BatchFuelController.from_control_system(build_fuel_control_system())
+    consumption = controller.compute(weights, speeds, powers)
+"""
+
+import time
+
+import numpy as np
+from skfuzzy.control.term import Term, TermAggregate
+
+from fuel import build_fuel_control_system
+
+FUEL_INPUTS = ("car_weight", "average_speed", "power")
+
+
+class BatchFuelController:
+    """
+    Fuzzy controller compiled to NumPy arrays for vectorized evaluation.
+
+    :ivar input_names: Names of the inputs, in the order ``compute`` takes them
+    :ivar input_universes: Universe of every input
+    :ivar input_memberships: (terms x universe) membership matrix of every input
+    :ivar rule_terms: (rules x inputs) term index used by every rule, -1 if the rule doesn't use the input
+    :ivar rule_weights: Weight of every rule
+    :ivar rule_outputs: Output term index of every rule
+    :ivar output_universe: Universe of the output
+    :ivar output_memberships: (terms x universe) membership matrix of the output
+    :ivar chunk_size: Number of rows evaluated at once, limits the memory of temporary arrays
+    """
+
+    def __init__(self, input_names, input_universes, input_memberships, rule_terms, rule_weights,
+                 rule_outputs, output_universe, output_memberships, chunk_size=16384):
+        self.input_names = tuple(input_names)
+        self.input_universes = [np.asarray(universe, dtype=np.float64) for universe in input_universes]
+        self.input_memberships = [np.asarray(mfs, dtype=np.float64) for mfs in input_memberships]
+        self.rule_terms = np.asarray(rule_terms, dtype=np.intp).reshape(-1, len(self.input_names))
+        self.rule_weights = np.asarray(rule_weights, dtype=np.float64)
+        self.rule_outputs = np.asarray(rule_outputs, dtype=np.intp)
+        self.output_universe = np.asarray(output_universe, dtype=np.float64)
+        self.output_memberships = np.asarray(output_memberships, dtype=np.float64)
+        self.chunk_size = chunk_size
+
+    @classmethod
+    def from_control_system(cls, control_system, input_names=FUEL_INPUTS, **kwargs):
+        """
+        Compile a skfuzzy control system with AND rules and one output.
+
+        :param control_system: skfuzzy ``ControlSystem``
+        :param input_names: Labels of the antecedents, in the order ``compute`` takes them
+        :param kwargs: Passed to the constructor (e.g. chunk_size)
+        :return: BatchFuelController
+        """
+        antecedents = {variable.label: variable for variable in control_system.antecedents}
+        consequents = list(control_system.consequents)
+        if len(consequents) != 1:
+            raise ValueError("Only control systems with one output are supported")
+        output = consequents[0]
+        output_labels = list(output.terms)
+
+        input_labels = [list(antecedents[name].terms) for name in input_names]
+        rule_terms, rule_weights, rule_outputs = [], [], []
+        for rule in control_system.rules:
+            if len(rule.consequent) != 1:
+                raise ValueError(f"Rule {rule} must have exactly one consequent")
+            terms = [-1] * len(input_names)
+            for term in _and_terms(rule.antecedent):
+                index = input_names.index(term.parent.label)
+                terms[index] = input_labels[index].index(term.label)
+            rule_terms.append(terms)
+            rule_weights.append(rule.consequent[0].weight)
+            rule_outputs.append(output_labels.index(rule.consequent[0].term.label))
+
+        return cls(
+            input_names,
+            [antecedents[name].universe for name in input_names],
+            [[antecedents[name][label].mf for label in labels] for name, labels in zip(input_names, input_labels)],
+            rule_terms,
+            rule_weights,
+            rule_outputs,
+            output.universe,
+            [output[label].mf for label in output_labels],
+            **kwargs,
+        )
+
+    def fuzzify(self, values):
+        """
+        Calculate the membership of every input value in every term.
+
+        :param values: List with one 1-D array of values per input
+        :return: List with one (terms + 1, rows) array per input, the last row is all ones
+            so rules that don't use the input (index -1) are not limited by it
+        """
+        memberships = []
+        for value, universe, mfs in zip(values, self.input_universes, self.input_memberships):
+            value = np.clip(value, universe[0], universe[-1])
+            membership = np.ones((len(mfs) + 1, len(value)))
+            for term, mf in enumerate(mfs):
+                membership[term] = np.interp(value, universe, mf)
+            memberships.append(membership)
+        return memberships
+
+    def fire_rules(self, memberships):
+        """
+        Calculate the activation of every output term.
+
+        :param memberships: Result of ``fuzzify``
+        :return: (output terms, rows) activation matrix
+        """
+        firing = memberships[0][self.rule_terms[:, 0]]
+        for index in range(1, len(memberships)):
+            np.minimum(firing, memberships[index][self.rule_terms[:, index]], out=firing)
+        firing *= self.rule_weights[:, None]
+
+        activation = np.zeros((len(self.output_memberships), firing.shape[1]))
+        for term in range(len(self.output_memberships)):
+            fired = firing[self.rule_outputs == term]
+            if len(fired):
+                activation[term] = fired.max(axis=0)
+        return activation
+
+    def defuzzify(self, activation):
+        """
+        Calculate the centroid of the aggregated output for every row.
+
+        :param activation: (output terms, rows) activation matrix from ``fire_rules``
+        :return: 1-D array of crisp outputs, NaN where no rule fired
+        """
+        x, mfs = self.output_universe, self.output_memberships
+        rows = activation.shape[1]
+        cut = activation.T[:, :, None]  # rows x terms x 1
+
+        # Points where every term reaches its activation level, like skfuzzy's upsampling.
+        # Segments without a crossing give one of their ends, which is already in the universe.
+        m1, m2 = mfs[:, :-1], mfs[:, 1:]
+        slope = m2 - m1
+        with np.errstate(divide="ignore", invalid="ignore"):
+            t = np.where(slope != 0, (cut - m1) / slope, 0.0)
+        crossings = x[:-1] + np.clip(t, 0.0, 1.0) * np.diff(x)
+        points = np.concatenate([np.broadcast_to(x, (rows, len(x))), crossings.reshape(rows, -1)], axis=1)
+        points.sort(axis=1)
+
+        aggregated = np.zeros_like(points)
+        for term, mf in enumerate(mfs):
+            np.maximum(aggregated, np.minimum(activation[term][:, None], np.interp(points, x, mf)), out=aggregated)
+
+        # Exact centroid of every trapezoid between neighbouring points
+        x1, dx = points[:, :-1], np.diff(points, axis=1)
+        y1, y2 = aggregated[:, :-1], aggregated[:, 1:]
+        height = y1 + y2
+        area = 0.5 * dx * height
+        with np.errstate(divide="ignore", invalid="ignore"):
+            moment = np.where(height > 0, x1 + dx * (y1 + 2 * y2) / (3 * height), 0.0)
+            return (moment * area).sum(axis=1) / np.where(area.sum(axis=1) > 0, area.sum(axis=1), np.nan)
+
+    def compute(self, *values):
+        """
+        Evaluate the controller for arrays of inputs.
+
+        :param values: One array per input (in ``input_names`` order), arrays are broadcast together
+        :return: Array of outputs with the broadcast shape of the inputs
+        """
+        values = np.broadcast_arrays(*[np.asarray(value, dtype=np.float64) for value in values])
+        shape = values[0].shape
+        flat = [value.ravel() for value in values]
+        output = np.empty(flat[0].shape)
+        for start in range(0, len(output), self.chunk_size):
+            chunk = [value[start:start + self.chunk_size] for value in flat]
+            output[start:start + self.chunk_size] = self.defuzzify(self.fire_rules(self.fuzzify(chunk)))
+        return output.reshape(shape)
+
+
+def _and_terms(antecedent):
+    """
+    Collect the terms of an antecedent made only of AND-ed terms.
+
+    :param antecedent: skfuzzy Term or TermAggregate
+    :return: List of terms
+    """
+    if isinstance(antecedent, Term):
+        return [antecedent]
+    if isinstance(antecedent, TermAggregate) and antecedent.kind == "and":
+        return _and_terms(antecedent.term1) + _and_terms(antecedent.term2)
+    raise ValueError(f"Only rules with AND-ed terms are supported, got {antecedent}")
+
+
+if __name__ == "__main__":
+    controller = BatchFuelController.from_control_system(build_fuel_control_system())
+
+    rows = 1_000_000
+    rng = np.random.default_rng(0)
+    weights = rng.uniform(1000, 3000, rows)
+    speeds = rng.uniform(40, 200, rows)
+    powers = rng.uniform(100, 300, rows)
+
+    start = time.perf_counter()
+    consumption = controller.compute(weights, speeds, powers)
+    elapsed = time.perf_counter() - start
+    print(f"{rows} vehicles in {elapsed:.2f} s ({rows / elapsed:.0f} rows/s), "
+          f"no rule fired for {np.isnan(consumption).sum()} rows")
+    print(f"Średnie spalanie paliwa (1800 kg, 100 km/h, 150 KM): {controller.compute(1800, 100, 150):.2f}")
@@ -0,0 +1,154 @@
+"""
+
+Authors: Mateusz Budzyński, Igor Gutowski
+
+==========================================
+Memoizing cache for the fuel consumption controller
+==========================================
+Many queries repeat the same or nearly the same (weight, speed, power) inputs. The cache
+quantizes the inputs to configurable steps (e.g. 10 kg, 1 km/h, 1 hp) and keeps the results
+in an LRU dictionary of bounded size, so a hit never touches skfuzzy.
+
+* A miss computes the quantized inputs with one ``ControlSystemSimulation`` built once, so every
+  input in the same bucket gets the same value no matter which one came first.
+* ``hits``, ``misses`` and ``evictions`` count what the cache does.
+* The cache remembers a fingerprint of the universes, membership functions and rules.
+  ``set_control_system`` clears it when they change, ``invalidate`` clears it explicitly.
+
+Example:
+    cache = CachedFuelController(steps=(10, 1, 1), max_size=100000)
+    cache.calculate_average_fuel_consumption(1800, 100, 150)
+"""
+
+import hashlib
+import time
+from collections import OrderedDict
+
+import numpy as np
+from skfuzzy import control as ctrl
+
+from fuel import build_fuel_control_system
+from fuel_batch import FUEL_INPUTS
+
+
+def control_system_fingerprint(control_system):
+    """
+    Function calculates a fingerprint of the rule base and membership functions.
+
+    :param control_system: skfuzzy ``ControlSystem``
+    :return: Hex digest that changes when a universe, membership function or rule changes
+    """
+    digest = hashlib.sha1()
+    for variable in sorted(control_system.fuzzy_variables, key=lambda variable: variable.label):
+        digest.update(variable.label.encode())
+        digest.update(np.asarray(variable.universe, dtype=np.float64).tobytes())
+        for label, term in variable.terms.items():
+            digest.update(label.encode())
+            digest.update(np.asarray(term.mf, dtype=np.float64).tobytes())
+    for rule in control_system.rules:
+        digest.update(str(rule).encode())
+    return digest.hexdigest()
+
+
+class CachedFuelController:
+    """
+    Fuel controller with quantized inputs and a size-bounded LRU cache of results.
+
+    :ivar steps: Quantization step of every input (weight, speed, power)
+    :ivar max_size: Maximum number of cached results
+    :ivar hits: Number of queries answered from the cache
+    :ivar misses: Number of queries computed with skfuzzy
+    :ivar evictions: Number of results dropped because the cache was full
+    :ivar fingerprint: Fingerprint of the control system the cached results come from
+    """
+
+    def __init__(self, control_system=None, steps=(10, 1, 1), max_size=100000):
+        """
+        :param control_system: skfuzzy ``ControlSystem``, the one from fuel.py by default
+        :param steps: Quantization step of every input (weight, speed, power)
+        :param max_size: Maximum number of cached results
+        """
+        self.steps = tuple(steps)
+        self.max_size = max_size
+        self.results = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.fingerprint = None
+        self.set_control_system(control_system if control_system is not None else build_fuel_control_system())
+
+    def set_control_system(self, control_system):
+        """
+        Use a new control system, the cache is cleared if its rules or membership functions differ.
+
+        :param control_system: skfuzzy ``ControlSystem``
+        """
+        fingerprint = control_system_fingerprint(control_system)
+        if fingerprint != self.fingerprint:
+            self.invalidate()
+            self.fingerprint = fingerprint
+        self.control_system = control_system
+        self.simulation = ctrl.ControlSystemSimulation(control_system, cache=False)
+
+    def invalidate(self):
+        """Remove all cached results, e.g. after the rules or membership functions were edited in place."""
+        self.results.clear()
+
+    def calculate_average_fuel_consumption(self, car_weight_value, average_speed_value, power_value):
+        """
+        Function calculates average fuel consumption, repeated inputs come from the cache.
+
+        :param car_weight_value: Car weight (kg)
+        :param average_speed_value: Average speed (km/h)
+        :param power_value: Vehicle power (horsepower)
+        :return: Calculated average fuel consumption (l/100km), NaN if no rule fires
+        """
+        key = tuple(
+            round(value / step)
+            for value, step in zip((car_weight_value, average_speed_value, power_value), self.steps)
+        )
+        result = self.results.get(key)
+        if result is not None:
+            self.hits += 1
+            self.results.move_to_end(key)
+            return result
+
+        self.misses += 1
+        for name, index, step in zip(FUEL_INPUTS, key, self.steps):
+            self.simulation.input[name] = index * step
+        self.simulation.compute()
+        result = self.simulation.output.get("average_fuel_consumption", float("nan"))
+
+        self.results[key] = result
+        if len(self.results) > self.max_size:
+            self.results.popitem(last=False)
+            self.evictions += 1
+        return result
+
+    def stats(self):
+        """
+        :return: Dict with the size of the cache, hits, misses, evictions and hit rate
+        """
+        queries = self.hits + self.misses
+        return {
+            "size": len(self.results),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / queries if queries else 0.0,
+        }
+
+
+if __name__ == "__main__":
+    cache = CachedFuelController(max_size=5000)
+    rng = np.random.default_rng(0)
+    # Traffic with many repeated vehicles
+    fleet = np.column_stack([rng.uniform(1000, 2500, 2000), rng.uniform(40, 190, 2000), rng.uniform(100, 290, 2000)])
+    queries = fleet[rng.integers(0, len(fleet), 50000)]
+
+    start = time.perf_counter()
+    for car_weight, average_speed, power in queries:
+        cache.calculate_average_fuel_consumption(car_weight, average_speed, power)
+    elapsed = time.perf_counter() - start
+    print(f"{len(queries)} queries in {elapsed:.2f} s ({elapsed / len(queries) * 1e6:.0f} us/query)")
+    print(cache.stats())
@@ -0,0 +1,202 @@
+"""
+
+Authors: Mateusz Budzyński, Igor Gutowski
+
+==========================================
+Fuel controller loaded from a rule file
+==========================================
+``FuelController`` reads universes, membership functions and rules from a JSON file
+(fuel_rules.json describes the same controller as fuel.py) and compiles them once into the
+dense arrays of ``BatchFuelController``: a (terms x universe) membership matrix per variable
+and a (rules x inputs) matrix of term indices for rule firing. Building the skfuzzy
+``ControlSystem`` graph is skipped, so rule bases with hundreds of rules load and run fast.
+
+Config format:
+    {
+      "inputs": {
+        "<name>": {
+          "universe": {"start": ..., "stop": ..., "step": ...},     # np.arange
+          "automf": ["<term>", ...]                                  # or "terms" like the output
+        }
+      },
+      "output": {
+        "name": "<name>",
+        "universe": {...},
+        "terms": {"<term>": {"trimf": [a, b, c]}}                    # trimf, trapmf or gaussmf
+      },
+      "rules": [
+        {"if": {"<input>": "<term>", ...}, "then": "<output term>", "weight": 1.0}
+      ]
+    }
+
+Inputs missing from a rule's "if" don't limit the rule. All conditions of a rule are AND-ed.
+
+Example:
+    controller = FuelController.from_config("fuel_rules.json")
+    controller.compute(1800, 100, 150)
+    controller.compute_many(np.array([[1800, 100, 150], [2500, 180, 280]]))
+"""
+
+import json
+import time
+
+import numpy as np
+import skfuzzy as fuzz
+from skfuzzy import control as ctrl
+
+from fuel_batch import BatchFuelController
+
+MEMBERSHIP_FUNCTIONS = {
+    "trimf": lambda universe, params: fuzz.trimf(universe, params),
+    "trapmf": lambda universe, params: fuzz.trapmf(universe, params),
+    "gaussmf": lambda universe, params: fuzz.gaussmf(universe, *params),
+}
+
+
+def _universe(config):
+    """
+    :param config: Dict with start, stop and step
+    :return: Universe array (np.arange, like fuel.py)
+    """
+    return np.arange(config["start"], config["stop"], config["step"])
+
+
+def _memberships(name, config, universe):
+    """
+    Function builds the membership functions of one variable.
+
+    :param name: Variable name
+    :param config: Variable config with "automf" or "terms"
+    :param universe: Universe of the variable
+    :return: (term labels, list of membership arrays)
+    """
+    if "automf" in config:
+        variable = ctrl.Antecedent(universe, name)
+        variable.automf(names=config["automf"])
+        return list(config["automf"]), [variable[label].mf for label in config["automf"]]
+
+    labels, memberships = [], []
+    for label, term in config["terms"].items():
+        (kind, params), = term.items()
+        if kind not in MEMBERSHIP_FUNCTIONS:
+            raise ValueError(f"Unknown membership function {kind} of {name}[{label}]")
+        labels.append(label)
+        memberships.append(MEMBERSHIP_FUNCTIONS[kind](universe, params))
+    return labels, memberships
+
+
+class FuelController:
+    """
+    Fuzzy controller compiled once from a rule file.
+
+    :ivar input_names: Names of the inputs, in the order ``compute`` takes them
+    :ivar output_name: Name of the output
+    :ivar batch: Compiled ``BatchFuelController``
+    :ivar build_ms: Time spent on loading and compiling the rule file
+    :ivar calls: Number of ``compute``/``compute_many`` calls
+    :ivar rows: Number of evaluated rows
+    :ivar compute_ms: Total time spent in ``compute``/``compute_many``
+    """
+
+    def __init__(self, config, chunk_size=16384):
+        """
+        :param config: Parsed rule file, see the module docstring
+        :param chunk_size: Rows evaluated at once by ``compute_many``
+        """
+        start = time.perf_counter()
+        self.input_names = tuple(config["inputs"])
+        self.output_name = config["output"]["name"]
+
+        universes, input_labels, input_memberships = [], [], []
+        for name, variable in config["inputs"].items():
+            universe = _universe(variable["universe"])
+            labels, memberships = _memberships(name, variable, universe)
+            universes.append(universe)
+            input_labels.append(labels)
+            input_memberships.append(memberships)
+
+        output_universe = _universe(config["output"]["universe"])
+        output_labels, output_memberships = _memberships(self.output_name, config["output"], output_universe)
+
+        rule_terms = np.full((len(config["rules"]), len(self.input_names)), -1, dtype=np.intp)
+        rule_weights = np.ones(len(config["rules"]))
+        rule_outputs = np.zeros(len(config["rules"]), dtype=np.intp)
+        for index, rule in enumerate(config["rules"]):
+            for name, label in rule["if"].items():
+                if name not in self.input_names:
+                    raise ValueError(f"Rule {index} uses unknown input {name}")
+                position = self.input_names.index(name)
+                if label not in input_labels[position]:
+                    raise ValueError(f"Rule {index} uses unknown term {name}[{label}]")
+                rule_terms[index, position] = input_labels[position].index(label)
+            if rule["then"] not in output_labels:
+                raise ValueError(f"Rule {index} uses unknown output term {rule['then']}")
+            rule_outputs[index] = output_labels.index(rule["then"])
+            rule_weights[index] = rule.get("weight", 1.0)
+
+        self.batch = BatchFuelController(
+            self.input_names, universes, input_memberships, rule_terms, rule_weights,
+            rule_outputs, output_universe, output_memberships, chunk_size=chunk_size,
+        )
+        self.build_ms = (time.perf_counter() - start) * 1000
+        self.calls = 0
+        self.rows = 0
+        self.compute_ms = 0.0
+
+    @classmethod
+    def from_config(cls, path, **kwargs):
+        """
+        Load a controller from a JSON rule file.
+
+        :param path: Path of the rule file
+        :param kwargs: Passed to the constructor
+        :return: FuelController
+        """
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f), **kwargs)
+
+    def compute(self, *values):
+        """
+        Evaluate the controller for one set of inputs.
+
+        :param values: One value per input, in ``input_names`` order
+        :return: Output value, NaN if no rule fires
+        """
+        return float(self.compute_many(np.asarray(values, dtype=np.float64)[None, :])[0])
+
+    def compute_many(self, values):
+        """
+        Evaluate the controller for many sets of inputs.
+
+        :param values: (rows x inputs) array, columns in ``input_names`` order
+        :return: 1-D array of outputs, NaN where no rule fires
+        """
+        start = time.perf_counter()
+        values = np.asarray(values, dtype=np.float64)
+        result = self.batch.compute(*values.T)
+        self.compute_ms += (time.perf_counter() - start) * 1000
+        self.calls += 1
+        self.rows += len(values)
+        return result
+
+    def timing(self):
+        """
+        :return: Dict with the build time, number of calls and rows and the time per call and per row
+        """
+        return {
+            "build_ms": self.build_ms,
+            "calls": self.calls,
+            "rows": self.rows,
+            "ms_per_call": self.compute_ms / self.calls if self.calls else 0.0,
+            "us_per_row": self.compute_ms * 1000 / self.rows if self.rows else 0.0,
+        }
+
+
+if __name__ == "__main__":
+    controller = FuelController.from_config("fuel_rules.json")
+    print(f"Średnie spalanie paliwa: {controller.compute(1800, 100, 150):.2f}")
+
+    rng = np.random.default_rng(0)
+    fleet = np.column_stack([rng.uniform(1000, 3000, 100000), rng.uniform(40, 200, 100000), rng.uniform(100, 300, 100000)])
+    controller.compute_many(fleet)
+    print(controller.timing())
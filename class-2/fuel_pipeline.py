@@ -0,0 +1,181 @@
+"""
+
+Authors: Mateusz Budzyński, Igor Gutowski
+
+==========================================
+Streaming fleet scoring with the fuel consumption controller
+==========================================
+Reads a large CSV file of vehicles in fixed-size chunks, evaluates every chunk with the
+compiled ``FuelController`` and appends the results to the output file right away, so memory
+stays constant no matter how big the input is. Chunks can be spread over a process pool; at
+most two chunks per worker are in flight and results are written in input order.
+
+Input: CSV with a header and car_weight, average_speed, power columns (other columns are
+copied to the output). Parquet input is read in batches when pyarrow is installed:
+    pip install pyarrow
+
+Usage:
+    python fuel_pipeline.py fleet.csv scored.csv --chunk-size 100000 --workers 4
+    python fuel_pipeline.py fleet.csv scored.csv --generate 1000000
+"""
+
+import argparse
+import csv
+import io
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import numpy as np
+
+from fuel_controller import FuelController
+
+OUTPUT_COLUMN = "average_fuel_consumption"
+DIALECT = "excel"  # CSV dialect of the input and of the output
+
+controller = None  # FuelController of the current process, created by init_worker
+
+
+def init_worker(config_path):
+    """
+    Load the controller once per process.
+
+    :param config_path: Path of the rule file
+    """
+    global controller
+    controller = FuelController.from_config(config_path)
+
+
+def score_chunk(rows, columns):
+    """
+    Evaluate one chunk and format it as CSV text.
+
+    :param rows: List of input rows (lists of strings)
+    :param columns: Indices of the car_weight, average_speed and power columns
+    :return: CSV text of the rows with the result appended
+    """
+    values = np.array([[row[column] for column in columns] for row in rows], dtype=np.float64)
+    result = controller.compute_many(values)
+    # csv.writer quotes pass-through fields that contain commas or quotes
+    text = io.StringIO()
+    writer = csv.writer(text, dialect=DIALECT)
+    writer.writerows(row + [f"{value:.4f}"] for row, value in zip(rows, result))
+    return text.getvalue()
+
+
+def read_chunks(path, chunk_size):
+    """
+    Read the input file in chunks.
+
+    :param path: CSV or Parquet file
+    :param chunk_size: Rows per chunk
+    :return: (header, generator of lists of rows as strings)
+    """
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        parquet = pq.ParquetFile(path)
+        header = parquet.schema_arrow.names
+
+        def chunks():
+            for batch in parquet.iter_batches(batch_size=chunk_size):
+                columns = [column.to_pylist() for column in batch.columns]
+                yield [[str(value) for value in row] for row in zip(*columns)]
+
+        return header, chunks()
+
+    f = open(path, newline="", encoding="utf-8")
+    reader = csv.reader(f, dialect=DIALECT)
+    header = next(reader)
+
+    def chunks():
+        with f:
+            while True:
+                rows = list(islice(reader, chunk_size))
+                if not rows:
+                    return
+                yield rows
+
+    return header, chunks()
+
+
+def run_pipeline(input_path, output_path, config_path="fuel_rules.json", chunk_size=100000, workers=0):
+    """
+    Score the whole input file and write the output file.
+
+    :param input_path: CSV or Parquet file with vehicles
+    :param output_path: Output CSV file
+    :param config_path: Rule file of the controller
+    :param chunk_size: Rows per chunk
+    :param workers: Number of processes, 0 evaluates in the current process
+    :return: Number of scored rows
+    """
+    header, chunks = read_chunks(input_path, chunk_size)
+    columns = [header.index(name) for name in FuelController.from_config(config_path).input_names]
+    rows = 0
+    start = time.perf_counter()
+
+    with open(output_path, "w", newline="", encoding="utf-8") as out:
+        csv.writer(out, dialect=DIALECT).writerow(header + [OUTPUT_COLUMN])
+
+        if workers == 0:
+            init_worker(config_path)
+            for chunk in chunks:
+                out.write(score_chunk(chunk, columns))
+                rows += len(chunk)
+        else:
+            with ProcessPoolExecutor(workers, initializer=init_worker, initargs=(config_path,)) as pool:
+                pending = deque()
+                for chunk in chunks:
+                    pending.append((len(chunk), pool.submit(score_chunk, chunk, columns)))
+                    if len(pending) >= 2 * workers:
+                        size, future = pending.popleft()
+                        out.write(future.result())
+                        rows += size
+                while pending:
+                    size, future = pending.popleft()
+                    out.write(future.result())
+                    rows += size
+
+    elapsed = time.perf_counter() - start
+    print(f"Scored {rows} rows in {elapsed:.2f} s ({rows / elapsed:.0f} rows/s), saved to {output_path}")
+    return rows
+
+
+def generate_fleet(path, rows, seed=0, chunk_size=100000):
+    """
+    Write a random fleet file for testing.
+
+    :param path: Output CSV file
+    :param rows: Number of vehicles
+    :param seed: Random seed
+    :param chunk_size: Rows generated at once
+    """
+    rng = np.random.default_rng(seed)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("vehicle_id,car_weight,average_speed,power\n")
+        for start in range(0, rows, chunk_size):
+            size = min(chunk_size, rows - start)
+            ids = np.arange(start, start + size)
+            values = np.column_stack([ids, rng.uniform(1000, 3000, size), rng.uniform(40, 200, size), rng.uniform(100, 300, size)])
+            np.savetxt(f, values, fmt=["%d", "%.1f", "%.1f", "%.1f"], delimiter=",")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score a fleet file with the fuel consumption controller.")
+    parser.add_argument("input", help="CSV (or Parquet) file with car_weight, average_speed and power columns")
+    parser.add_argument("output", help="Output CSV file")
+    parser.add_argument("--config", default="fuel_rules.json", help="Rule file of the controller")
+    parser.add_argument("--chunk-size", type=int, default=100000)
+    parser.add_argument("--workers", type=int, default=0, help="Number of processes, 0 - no pool")
+    parser.add_argument("--generate", type=int, metavar="ROWS", help="Write a random input file with ROWS vehicles first")
+    args = parser.parse_args()
+
+    if args.generate:
+        generate_fleet(args.input, args.generate)
+    run_pipeline(args.input, args.output, args.config, args.chunk_size, args.workers)
+
+
+if __name__ == "__main__":
+    main()
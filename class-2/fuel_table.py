@@ -0,0 +1,236 @@
+"""
+
+Authors: Mateusz Budzyński, Igor Gutowski
+
+==========================================
+Precomputed lookup table for the fuel consumption controller
+==========================================
+The controller inputs live on fixed universes (weight, speed and power are clipped to them
+by ``ControlSystemSimulation``), so the output can be precomputed once on a regular 3-D grid
+and queries answered by trilinear interpolation in microseconds.
+
+* The grid is computed with ``BatchFuelController`` (same results as skfuzzy) and saved as a
+  ``.npy`` file that is opened with ``mmap_mode='r'``, next to a small JSON manifest with the
+  grid bounds and the measured error.
+* Grid points in a region where no rule fires are NaN, so interpolation in a cell touching one
+  gives NaN too. Such queries fall back to the exact ``BatchFuelController`` (the answer is NaN
+  only if no rule fires at the query itself). The share of these fallbacks is measured and kept
+  in the manifest, it grows with coarser grids.
+* The error is measured on random points against the exact controller, and on a few of them
+  against ``ControlSystemSimulation`` itself. The controller output jumps where a rule stops
+  firing, so the largest errors come from the cells on those edges. The reported max error is
+  the largest error seen in the random sample, not a bound - the mean and p99 errors show the
+  typical accuracy.
+
+Usage:
+    python fuel_table.py --shape 81 81 81 --output fuel_table.npy
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+from skfuzzy import control as ctrl
+
+from fuel import build_fuel_control_system
+from fuel_batch import BatchFuelController
+
+
+def build_table(controller, shape, path):
+    """
+    Compute the controller output on a regular grid and save it.
+
+    :param controller: BatchFuelController
+    :param shape: Number of grid points for every input
+    :param path: Output ``.npy`` file, the manifest is saved to ``path + '.json'``
+    :return: FuelLookupTable opened from the saved file, falling back to ``controller``
+    """
+    bounds = [(float(universe[0]), float(universe[-1])) for universe in controller.input_universes]
+    axes = [np.linspace(low, high, size) for (low, high), size in zip(bounds, shape)]
+    grid = controller.compute(*np.meshgrid(*axes, indexing="ij"))
+    np.save(path, grid)
+    with open(path + ".json", "w") as f:
+        json.dump({"inputs": controller.input_names, "shape": list(shape), "bounds": bounds}, f, indent=2)
+    return FuelLookupTable(path, controller)
+
+
+def measure_error(table, controller, samples=200000, exact_samples=200, seed=0):
+    """
+    Measure the interpolation error of the table and save it in the manifest.
+
+    :param table: FuelLookupTable
+    :param controller: BatchFuelController the table was built from
+    :param samples: Random points compared with the batch controller
+    :param exact_samples: Random points compared with skfuzzy ``ControlSystemSimulation``
+    :param seed: Random seed
+    :return: Dict with max_error (of the sample, not a bound), mean_error, p99_error,
+        nan_mismatches, fallback_rate and max_error_simulation
+    """
+    rng = np.random.default_rng(seed)
+    points = [rng.uniform(low, high, samples) for low, high in table.bounds]
+    expected = controller.compute(*points)
+    fallbacks = table.fallbacks
+    result = table.compute(*points)
+    fallbacks = table.fallbacks - fallbacks
+    both = ~np.isnan(expected) & ~np.isnan(result)
+    error = np.abs(expected[both] - result[both])
+
+    simulation = ctrl.ControlSystemSimulation(build_fuel_control_system())
+    max_error_simulation = 0.0
+    for row in np.flatnonzero(both)[:exact_samples]:
+        for name, value in zip(table.inputs, points):
+            simulation.input[name] = value[row]
+        simulation.compute()
+        exact = simulation.output["average_fuel_consumption"]
+        max_error_simulation = max(max_error_simulation, abs(exact - table.compute_one(*(value[row] for value in points))))
+
+    stats = {
+        "max_error": float(error.max()),
+        "mean_error": float(error.mean()),
+        "p99_error": float(np.percentile(error, 99)),
+        "nan_mismatches": int((np.isnan(expected) != np.isnan(result)).sum()),
+        "fallback_rate": fallbacks / samples,
+        "samples": samples,
+        "max_error_simulation": max_error_simulation,
+        "exact_samples": int(min(exact_samples, both.sum())),
+    }
+    table.manifest["error"] = stats
+    with open(table.path + ".json", "w") as f:
+        json.dump(table.manifest, f, indent=2)
+    return stats
+
+
+class FuelLookupTable:
+    """
+    Memory-mapped grid of controller outputs answered by trilinear interpolation.
+
+    :ivar path: Path of the ``.npy`` grid
+    :ivar manifest: Content of the JSON manifest (inputs, shape, bounds, error)
+    :ivar grid: Memory-mapped (weight x speed x power) output grid
+    :ivar controller: ``BatchFuelController`` answering the queries the grid can't (NaN corners)
+    :ivar fallbacks: Number of queries answered by ``controller``
+    """
+
+    def __init__(self, path, controller=None):
+        """
+        Open a table saved with ``build_table``.
+
+        :param path: Path of the ``.npy`` grid
+        :param controller: ``BatchFuelController`` for queries in cells with NaN corners,
+            None - such queries return NaN
+        """
+        self.path = path
+        self.controller = controller
+        self.fallbacks = 0
+        with open(path + ".json") as f:
+            self.manifest = json.load(f)
+        self.inputs = self.manifest["inputs"]
+        self.bounds = [tuple(bound) for bound in self.manifest["bounds"]]
+        self.grid = np.load(path, mmap_mode="r")
+        self.shape = self.grid.shape
+        self.steps = [(high - low) / (size - 1) for (low, high), size in zip(self.bounds, self.shape)]
+        self.flat = memoryview(self.grid.reshape(-1))  # Fast scalar access for compute_one
+
+    def compute(self, *values):
+        """
+        Interpolate the output for arrays of inputs.
+
+        :param values: One array per input (weight, speed, power), arrays are broadcast together
+        :return: Array of outputs with the broadcast shape of the inputs
+        """
+        values = np.broadcast_arrays(*[np.asarray(value, dtype=np.float64) for value in values])
+        shape = values[0].shape
+        values = [np.atleast_1d(value) for value in values]  # Scalars too, for the fallback assignment
+        indices, fractions = [], []
+        for value, (low, high), step, size in zip(values, self.bounds, self.steps, self.shape):
+            position = (np.clip(value, low, high) - low) / step
+            index = np.minimum(position.astype(np.intp), size - 2)
+            indices.append(index)
+            fractions.append(position - index)
+
+        (i, j, k), (fi, fj, fk) = indices, fractions
+        grid = self.grid
+        c00 = grid[i, j, k] * (1 - fk) + grid[i, j, k + 1] * fk
+        c01 = grid[i, j + 1, k] * (1 - fk) + grid[i, j + 1, k + 1] * fk
+        c10 = grid[i + 1, j, k] * (1 - fk) + grid[i + 1, j, k + 1] * fk
+        c11 = grid[i + 1, j + 1, k] * (1 - fk) + grid[i + 1, j + 1, k + 1] * fk
+        result = (c00 * (1 - fj) + c01 * fj) * (1 - fi) + (c10 * (1 - fj) + c11 * fj) * fi
+
+        missing = np.isnan(result)
+        if self.controller is not None and missing.any():
+            result[missing] = self.controller.compute(*(value[missing] for value in values))
+            self.fallbacks += int(missing.sum())
+        return result.reshape(shape)
+
+    def compute_one(self, car_weight, average_speed, power):
+        """
+        Interpolate the output for one set of inputs, without NumPy overhead.
+
+        :param car_weight: Car weight (kg)
+        :param average_speed: Average speed (km/h)
+        :param power: Vehicle power (horsepower)
+        :return: Average fuel consumption (l/100km), NaN if no rule fires at the inputs
+            (or near them, without a controller)
+        """
+        corner, fractions = [], []
+        for value, (low, high), step, size in zip((car_weight, average_speed, power), self.bounds, self.steps, self.shape):
+            position = (min(max(value, low), high) - low) / step
+            index = min(int(position), size - 2)
+            corner.append(index)
+            fractions.append(position - index)
+
+        _, ny, nz = self.shape
+        fi, fj, fk = fractions
+        flat = self.flat
+        base = (corner[0] * ny + corner[1]) * nz + corner[2]
+        step_i, step_j = ny * nz, nz
+        c00 = flat[base] * (1 - fk) + flat[base + 1] * fk
+        c01 = flat[base + step_j] * (1 - fk) + flat[base + step_j + 1] * fk
+        c10 = flat[base + step_i] * (1 - fk) + flat[base + step_i + 1] * fk
+        c11 = flat[base + step_i + step_j] * (1 - fk) + flat[base + step_i + step_j + 1] * fk
+        result = (c00 * (1 - fj) + c01 * fj) * (1 - fi) + (c10 * (1 - fj) + c11 * fj) * fi
+
+        if result != result and self.controller is not None:  # NaN corner
+            self.fallbacks += 1
+            return float(self.controller.compute(car_weight, average_speed, power))
+        return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute the fuel controller on a 3-D grid.")
+    parser.add_argument("--shape", type=int, nargs=3, default=[81, 81, 81], metavar=("WEIGHT", "SPEED", "POWER"))
+    parser.add_argument("--output", default="fuel_table.npy")
+    args = parser.parse_args()
+
+    controller = BatchFuelController.from_control_system(build_fuel_control_system())
+    start = time.perf_counter()
+    table = build_table(controller, args.shape, args.output)
+    print(f"Built {args.shape} grid in {time.perf_counter() - start:.2f} s, saved to {args.output}")
+
+    stats = measure_error(table, controller)
+    print(f"Error on {stats['samples']} random points: max {stats['max_error']:.4f} l/100km (of the sample, not a bound), "
+          f"mean {stats['mean_error']:.4f}, p99 {stats['p99_error']:.4f}; "
+          f"max vs ControlSystemSimulation ({stats['exact_samples']} points): {stats['max_error_simulation']:.4f}")
+    print(f"Fallbacks to the controller (NaN grid corners): {stats['fallback_rate']:.2%}, "
+          f"NaN mismatches: {stats['nan_mismatches']} / {stats['samples']}")
+
+    queries = 100000
+    start = time.perf_counter()
+    for _ in range(queries):
+        table.compute_one(1800, 100, 150)
+    table_us = (time.perf_counter() - start) / queries * 1e6
+
+    simulation = ctrl.ControlSystemSimulation(build_fuel_control_system(), cache=False)
+    start = time.perf_counter()
+    for _ in range(100):
+        simulation.input["car_weight"] = 1800
+        simulation.input["average_speed"] = 100
+        simulation.input["power"] = 150
+        simulation.compute()
+    simulation_us = (time.perf_counter() - start) / 100 * 1e6
+    print(f"Per query: table {table_us:.1f} us, ControlSystemSimulation {simulation_us:.0f} us")
+
+
+if __name__ == "__main__":
+    main()
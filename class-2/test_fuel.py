@@ -0,0 +1,48 @@
+"""
+Authors: Mateusz Budzyński, Igor Gutowski
+
+Tests that fuel.py and fuel_rules.json describe the same controller.
+"""
+
+import json
+import os
+
+import numpy as np
+
+from fuel import build_fuel_control_system
+from fuel_controller import _memberships, _universe
+
+CONFIG = os.path.join(os.path.dirname(__file__), "fuel_rules.json")
+
+
+def load_config():
+    with open(CONFIG, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_variables_match_config():
+    config = load_config()
+    variables = {variable.label: variable for variable in build_fuel_control_system().fuzzy_variables}
+    expected = dict(config["inputs"], **{config["output"]["name"]: config["output"]})
+    assert set(variables) == set(expected)
+
+    for name, variable_config in expected.items():
+        universe = _universe(variable_config["universe"])
+        labels, memberships = _memberships(name, variable_config, universe)
+        np.testing.assert_array_equal(variables[name].universe, universe)
+        assert list(variables[name].terms) == labels
+        for label, membership in zip(labels, memberships):
+            np.testing.assert_allclose(variables[name][label].mf, membership)
+
+
+def test_rules_match_config():
+    config = load_config()
+    rules = []
+    for rule in build_fuel_control_system().rules:
+        antecedents = [(term.parent.label, term.label) for term in rule.antecedent_terms]
+        if len(antecedents) > 1:
+            assert rule.antecedent.kind == "and"
+        (consequent,) = rule.consequent
+        assert consequent.term.parent.label == config["output"]["name"]
+        rules.append((dict(antecedents), consequent.term.label))
+    assert rules == [(rule["if"], rule["then"]) for rule in config["rules"]]
@@ -0,0 +1,33 @@
+"""
+Authors: Mateusz Budzyński, Igor Gutowski
+
+Tests of the streaming fleet scoring pipeline.
+"""
+
+import csv
+import os
+
+from fuel_pipeline import OUTPUT_COLUMN, run_pipeline
+
+CONFIG = os.path.join(os.path.dirname(__file__), "fuel_rules.json")
+
+
+def test_quoted_fields_are_kept(tmp_path):
+    input_path, output_path = tmp_path / "fleet.csv", tmp_path / "scored.csv"
+    rows = [
+        ["vehicle", "car_weight", "average_speed", "power"],
+        ["Ford, Focus", "1500", "90", "150"],
+        ['The "Beast"', "2500", "150", "250"],
+    ]
+    with open(input_path, "w", newline="", encoding="utf-8") as f:
+        csv.writer(f).writerows(rows)
+
+    assert run_pipeline(str(input_path), str(output_path), CONFIG, chunk_size=1) == 2
+
+    with open(output_path, newline="", encoding="utf-8") as f:
+        scored = list(csv.reader(f))
+    assert scored[0] == rows[0] + [OUTPUT_COLUMN]
+    for original, row in zip(rows[1:], scored[1:]):
+        assert len(row) == 5
+        assert row[:4] == original
+        float(row[4])
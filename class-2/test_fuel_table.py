@@ -0,0 +1,40 @@
+"""
+Authors: Mateusz Budzyński, Igor Gutowski
+
+Tests of the fuel consumption lookup table.
+"""
+
+import numpy as np
+import pytest
+
+from fuel import build_fuel_control_system
+from fuel_batch import BatchFuelController
+from fuel_table import build_table
+
+
+@pytest.fixture(scope="module")
+def table(tmp_path_factory):
+    controller = BatchFuelController.from_control_system(build_fuel_control_system())
+    return build_table(controller, (21, 21, 21), str(tmp_path_factory.mktemp("table") / "fuel_table.npy"))
+
+
+@pytest.mark.parametrize("query", [(1405.0, 144.0, 283.0), (1750.0, 115.0, 290.0)])
+def test_scalar_query_in_nan_cell(table, query):
+    assert np.isnan(table.grid).any()
+    fallbacks = table.fallbacks
+    result = table.compute(*query)
+    expected = float(table.controller.compute(*query))
+    assert np.ndim(result) == 0
+    assert table.fallbacks == fallbacks + 1
+    assert float(result) == pytest.approx(expected, nan_ok=True)
+    assert table.compute_one(*query) == pytest.approx(expected, nan_ok=True)
+
+
+def test_array_queries_in_nan_cells(table):
+    rng = np.random.default_rng(0)
+    points = [rng.uniform(low, high, (50, 40)) for low, high in table.bounds]
+    result = table.compute(*points)
+    expected = table.controller.compute(*points)
+    assert result.shape == (50, 40)
+    assert table.fallbacks > 0
+    np.testing.assert_array_equal(np.isnan(result), np.isnan(expected))
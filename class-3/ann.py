@@ -0,0 +1,259 @@
+"""
+Authors: Mateusz Budzyński, Igor Gutowski
+
+Approximate nearest-neighbour search for the movie recommender (random-projection LSH).
+
+The exact search compares a user with every other user (users x movies work per query).
+With many users, the approximate mode first finds candidate users with locality-sensitive
+hashing and then ranks only the candidates with the exact similarity from movies.py:
+
+    - ratings are centered (rating - 5.5, 0 for movies that weren't rated), users who agree on
+      the same movies point in similar directions,
+    - every table hashes a user to `bits` signs of random projections (SimHash),
+    - a query collects the users from its bucket in every table (and, with probe=True, from the
+      buckets that differ in one bit), then computes the exact similarity only for them.
+
+More tables and probes give higher recall, more bits give smaller buckets and faster queries.
+recall_at_k measures the recall against the exact ranking of movies.euclidean_distance.
+
+With sparse ratings many pairs share a single movie with the same rating and get the top
+similarity 1.0, then almost any user is a "nearest" neighbour and the recall means nothing.
+The benchmark therefore only counts users with at least min_common common movies as
+neighbours, generates denser ratings, and reports the recall of the same number of random
+candidates next to the LSH recall.
+
+Usage:
+    python ann.py --users 200000 --movies 500 --tables 8 --bits 14
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from recommender import RatingMatrix
+
+CENTER = 5.5  # Middle of the 1-10 rating scale
+MIN_COMMON = 5  # Common movies needed to count as a neighbour in the benchmark
+
+
+class LSHIndex:
+    """
+    Random-projection LSH index over user rating vectors.
+
+    Attributes:
+    - matrix (RatingMatrix): Ratings of all users.
+    - tables (int): Number of hash tables.
+    - bits (int): Number of projections (hash bits) per table.
+    - codes (np.ndarray): tables x users hash codes.
+    - order (np.ndarray): tables x users rows sorted by code, buckets are contiguous slices.
+    - sorted_codes (np.ndarray): tables x users codes in the order of order.
+    """
+
+    def __init__(self, matrix, tables=8, bits=12, seed=0, block_size=65536):
+        """
+        Build the index.
+
+        Parameters:
+        - matrix (RatingMatrix): Ratings of all users.
+        - tables (int): Number of hash tables.
+        - bits (int): Number of hash bits per table (at most 62).
+        - seed (int): Seed of the random projections.
+        - block_size (int): Number of users hashed at once.
+        """
+        self.matrix = matrix
+        self.tables = tables
+        self.bits = bits
+        rng = np.random.default_rng(seed)
+        self.projections = rng.standard_normal((len(matrix.movies), tables * bits)).astype(np.float32)
+        self.weights = (1 << np.arange(bits, dtype=np.int64))
+
+        users = len(matrix.users)
+        self.codes = np.empty((tables, users), dtype=np.int64)
+        for start in range(0, users, block_size):
+            rows = np.arange(start, min(start + block_size, users))
+            self.codes[:, rows] = self._hash(rows)
+        self.order = np.argsort(self.codes, axis=1, kind="stable")
+        self.sorted_codes = np.take_along_axis(self.codes, self.order, axis=1)
+
+    def _hash(self, rows):
+        """
+        Calculate the hash codes of some users in every table.
+
+        Parameters:
+        - rows (np.ndarray): Rows of the users.
+
+        Returns:
+        np.ndarray: tables x len(rows) codes.
+        """
+        centered = (self.matrix.ratings[rows] - CENTER) * self.matrix._mask[rows]
+        signs = (centered @ self.projections > 0).reshape(len(rows), self.tables, self.bits)
+        return (signs @ self.weights).T
+
+    def candidates(self, row, probe=True):
+        """
+        Find the users that share a bucket with the user in any table.
+
+        Parameters:
+        - row (int): Row of the user.
+        - probe (bool): Also look into the buckets that differ in one bit.
+
+        Returns:
+        np.ndarray: Rows of the candidate users (without the user itself).
+        """
+        found = []
+        flips = self.weights if probe else np.empty(0, dtype=np.int64)
+        for table in range(self.tables):
+            code = self.codes[table, row]
+            probes = np.concatenate([[code], code ^ flips])
+            starts = np.searchsorted(self.sorted_codes[table], probes, side="left")
+            ends = np.searchsorted(self.sorted_codes[table], probes, side="right")
+            found.extend(self.order[table, start:end] for start, end in zip(starts, ends) if end > start)
+        if not found:
+            return np.empty(0, dtype=np.int64)
+        result = np.unique(np.concatenate(found))
+        return result[result != row]
+
+    def query(self, row, k=10, probe=True, min_common=1):
+        """
+        Find the approximately most similar users.
+
+        Parameters:
+        - row (int): Row of the user.
+        - k (int): Number of neighbours.
+        - probe (bool): Also look into the buckets that differ in one bit.
+        - min_common (int): Common movies needed to count as a neighbour.
+
+        Returns:
+        tuple: (rows, similarities) of up to k neighbours, most similar first.
+        """
+        return rank_candidates(self.matrix, row, self.candidates(row, probe), k, min_common)
+
+
+def rank_candidates(matrix, row, candidates, k=10, min_common=1):
+    """
+    Rank candidate users by the exact similarity.
+
+    Parameters:
+    - matrix (RatingMatrix): Ratings of all users.
+    - row (int): Row of the user.
+    - candidates (np.ndarray): Rows of the candidate users.
+    - k (int): Number of neighbours.
+    - min_common (int): Common movies needed to count as a neighbour.
+
+    Returns:
+    tuple: (rows, similarities) of up to k neighbours, most similar first.
+    """
+    similarity = matrix.pair_similarities(row, candidates)
+    keep = (similarity != -1) & (matrix._mask[candidates] @ matrix._mask[row] >= min_common)
+    candidates, similarity = candidates[keep], similarity[keep]
+    if len(candidates) > k:
+        top = np.argpartition(-similarity, k - 1)[:k]
+        candidates, similarity = candidates[top], similarity[top]
+    order = np.argsort(-similarity, kind="stable")
+    return candidates[order], similarity[order]
+
+
+def recall_at_k(index, k=10, samples=200, probe=True, seed=0, min_common=MIN_COMMON):
+    """
+    Compare the approximate neighbours with the exact ranking.
+
+    A neighbour counts as found if its exact similarity is at least the K-th best exact
+    similarity, so ties at the K-th place don't lower the recall. The same number of random
+    candidates is ranked too (random_recall): the LSH recall is only meaningful above it.
+
+    Parameters:
+    - index (LSHIndex): Index to measure.
+    - k (int): Number of neighbours.
+    - samples (int): Number of random query users.
+    - probe (bool): Passed to query.
+    - seed (int): Seed of the user sample and of the random candidates.
+    - min_common (int): Common movies needed to count as a neighbour.
+
+    Returns:
+    dict: recall, random_recall, mean query time and mean number of candidates, exact query time.
+    """
+    matrix = index.matrix
+    rng = np.random.default_rng(seed)
+    rows = rng.choice(len(matrix.users), min(samples, len(matrix.users)), replace=False)
+    found = found_random = expected = candidates = 0
+    approximate_time = exact_time = 0.0
+    for row in rows:
+        start = time.perf_counter()
+        exact = matrix.similarity_block([row])[0]
+        exact[row] = -1
+        exact[matrix._mask @ matrix._mask[row] < min_common] = -1
+        exact_time += time.perf_counter() - start
+        valid = np.count_nonzero(exact != -1)
+        if valid == 0:
+            continue
+        threshold = np.partition(exact, -min(k, valid))[-min(k, valid)]
+
+        start = time.perf_counter()
+        _, similarity = index.query(row, k, probe, min_common)
+        approximate_time += time.perf_counter() - start
+        count = len(index.candidates(row, probe))
+        candidates += count
+        found += np.count_nonzero(similarity >= threshold)
+        expected += min(k, valid)
+
+        others = np.flatnonzero(np.arange(len(matrix.users)) != row)
+        _, similarity = rank_candidates(matrix, row, rng.choice(others, min(count, len(others)), replace=False), k, min_common)
+        found_random += np.count_nonzero(similarity >= threshold)
+
+    return {
+        "recall": found / expected if expected else 0.0,
+        "random_recall": found_random / expected if expected else 0.0,
+        "query_ms": approximate_time / len(rows) * 1000,
+        "exact_query_ms": exact_time / len(rows) * 1000,
+        "candidates": candidates / len(rows),
+    }
+
+
+def synthetic_matrix(users, movies, groups=50, density=0.2, seed=0):
+    """
+    Generate ratings of users from a few taste groups, for benchmarks.
+
+    Parameters:
+    - users (int): Number of users.
+    - movies (int): Number of movies.
+    - groups (int): Number of taste groups.
+    - density (float): Fraction of movies rated by a user.
+    - seed (int): Random seed.
+
+    Returns:
+    RatingMatrix
+    """
+    rng = np.random.default_rng(seed)
+    profiles = rng.uniform(1, 10, (groups, movies)).astype(np.float32)
+    group = rng.integers(0, groups, users)
+    ratings = np.clip(np.rint(profiles[group] + rng.normal(0, 1, (users, movies)).astype(np.float32)), 1, 10)
+    mask = rng.random((users, movies)) < density
+    return RatingMatrix([f"user {row}" for row in range(users)], [f"movie {column}" for column in range(movies)], ratings, mask)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Approximate nearest neighbours for the movie recommender.")
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--movies", type=int, default=500)
+    parser.add_argument("--tables", type=int, default=8)
+    parser.add_argument("--bits", type=int, default=12)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--samples", type=int, default=100)
+    parser.add_argument("--density", type=float, default=0.2, help="Fraction of movies rated by a user")
+    parser.add_argument("--min-common", type=int, default=MIN_COMMON, help="Common movies needed to count as a neighbour")
+    args = parser.parse_args()
+
+    matrix = synthetic_matrix(args.users, args.movies, density=args.density)
+    start = time.perf_counter()
+    index = LSHIndex(matrix, args.tables, args.bits)
+    print(f"Built {args.tables} tables x {args.bits} bits for {args.users} users in {time.perf_counter() - start:.2f} s")
+    for probe in (False, True):
+        stats = recall_at_k(index, args.k, args.samples, probe, min_common=args.min_common)
+        print(f"probe={probe}: recall@{args.k} {stats['recall']:.3f} (random candidates {stats['random_recall']:.3f}), "
+              f"{stats['candidates']:.0f} candidates, "
+              f"{stats['query_ms']:.2f} ms/query (exact {stats['exact_query_ms']:.2f} ms/query)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+Authors: Mateusz Budzyński, Igor Gutowski
+
+Batch recommendation job: recommended and not recommended movies for every user.
+
+Every user gets the lists movies.suggest_movie would print for them (with the default
+BASELINE neighbour, see recommender.select_neighbor). The rating matrix is
+copied once into shared memory (multiprocessing.shared_memory) and the workers of a process
+pool attach to it without copying, each worker handles blocks of users with one vectorized
+similarity computation per block.
+
+The output is one compact .npz file:
+    users, movies - names,
+    recommended, not_recommended - users x 5 int32 movie indices, -1 where the list is shorter
+    (or the user has no common movies with anyone).
+
+Usage:
+    python batch.py --data data.json --output recommendations.npz
+    python batch.py --synthetic 100000 --workers 4
+    python batch.py --neighbor most_similar
+"""
+
+import argparse
+import time
+from multiprocessing import Pool, shared_memory
+
+import numpy as np
+
+from recommender import BASELINE, DATA_FILE, NEIGHBORS, RatingMatrix, select_neighbor
+
+LIST_SIZE = 5
+
+matrix = None  # RatingMatrix of the current worker, attached to shared memory by init_worker
+neighbor = BASELINE  # Neighbour convention of the current worker, see recommender.select_neighbor
+attached = []  # SharedMemory objects of the worker, kept open while it runs
+
+
+def share_arrays(arrays):
+    """
+    Copy arrays into new shared memory blocks.
+
+    Parameters:
+    - arrays (dict): name -> np.ndarray
+
+    Returns:
+    tuple: (list of SharedMemory blocks, dict name -> (block name, shape, dtype) for attach_arrays)
+    """
+    blocks, specs = [], {}
+    for name, array in arrays.items():
+        block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        np.ndarray(array.shape, array.dtype, buffer=block.buf)[...] = array
+        blocks.append(block)
+        specs[name] = (block.name, array.shape, array.dtype.str)
+    return blocks, specs
+
+
+def init_worker(users, movies, specs, neighbor_mode=BASELINE):
+    """
+    Attach the worker to the shared rating matrix.
+
+    Parameters:
+    - users (list): User names.
+    - movies (list): Movie titles.
+    - specs (dict): Shared arrays, see share_arrays.
+    - neighbor_mode (str): BASELINE or MOST_SIMILAR.
+    """
+    global matrix, neighbor
+    neighbor = neighbor_mode
+    arrays = {}
+    for name, (block_name, shape, dtype) in specs.items():
+        block = shared_memory.SharedMemory(name=block_name)
+        attached.append(block)
+        arrays[name] = np.ndarray(shape, np.dtype(dtype), buffer=block.buf)
+    matrix = RatingMatrix.from_prepared(users, movies, arrays)
+
+
+def suggest_block(rows):
+    """
+    Calculate the lists of a block of users, like movies.suggest_movie.
+
+    Parameters:
+    - rows (range): Rows of the users.
+
+    Returns:
+    tuple: (first row, len(rows) x 5 recommended, len(rows) x 5 not recommended)
+    """
+    rows = np.arange(rows.start, rows.stop)
+    similarity = matrix.similarity_block(rows)
+    similarity[np.arange(len(rows)), rows] = -1
+    chosen = select_neighbor(similarity, neighbor)
+    has_neighbor = chosen != -1
+
+    ratings = np.where(matrix.mask[chosen], matrix.ratings[chosen], -np.inf)
+    # Best first, equal ratings in the order the neighbour rated them, missing movies last
+    order = np.lexsort((matrix.positions[chosen], -ratings), axis=-1)
+    counts = matrix.mask[chosen].sum(axis=1)
+
+    recommended = np.full((len(rows), LIST_SIZE), -1, dtype=np.int32)
+    not_recommended = np.full((len(rows), LIST_SIZE), -1, dtype=np.int32)
+    for index in np.flatnonzero(has_neighbor):
+        sorted_movies = order[index, :counts[index]]
+        top, bottom = sorted_movies[:LIST_SIZE], sorted_movies[-LIST_SIZE - 1:-1]
+        recommended[index, :len(top)] = top
+        not_recommended[index, :len(bottom)] = bottom
+    return rows[0], recommended, not_recommended
+
+
+def run_batch(ratings, output, workers=None, block_size=1024, neighbor_mode=BASELINE):
+    """
+    Compute the lists of all users on a process pool and save them.
+
+    Parameters:
+    - ratings (RatingMatrix): Ratings of all users.
+    - output (str): Output .npz file.
+    - workers (int): Number of processes (None - one per CPU).
+    - block_size (int): Users per task.
+    - neighbor_mode (str): BASELINE or MOST_SIMILAR, see recommender.select_neighbor.
+
+    Returns:
+    tuple: (recommended, not_recommended) arrays
+    """
+    users = len(ratings.users)
+    recommended = np.empty((users, LIST_SIZE), dtype=np.int32)
+    not_recommended = np.empty((users, LIST_SIZE), dtype=np.int32)
+
+    start = time.perf_counter()
+    blocks, specs = share_arrays(ratings.prepared_arrays())
+    try:
+        with Pool(workers, initializer=init_worker, initargs=(ratings.users, ratings.movies, specs, neighbor_mode)) as pool:
+            tasks = [range(first, min(first + block_size, users)) for first in range(0, users, block_size)]
+            for first, top, bottom in pool.imap_unordered(suggest_block, tasks):
+                recommended[first:first + len(top)] = top
+                not_recommended[first:first + len(bottom)] = bottom
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+    elapsed = time.perf_counter() - start
+
+    np.savez_compressed(
+        output,
+        users=np.array(ratings.users),
+        movies=np.array(ratings.movies),
+        recommended=recommended,
+        not_recommended=not_recommended,
+    )
+    print(f"{users} users in {elapsed:.2f} s ({users / elapsed:.0f} users/s), saved to {output}")
+    return recommended, not_recommended
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recommend movies for every user.")
+    parser.add_argument("--data", default=DATA_FILE, help="JSON file with ratings")
+    parser.add_argument("--synthetic", type=int, metavar="USERS", help="Use generated ratings of USERS users instead")
+    parser.add_argument("--output", default="recommendations.npz")
+    parser.add_argument("--workers", type=int, default=None, help="Number of processes (default: one per CPU)")
+    parser.add_argument("--block-size", type=int, default=1024)
+    parser.add_argument("--neighbor", choices=NEIGHBORS, default=BASELINE, help="Whose ratings are suggested (default: like movies.py)")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        from ann import synthetic_matrix
+
+        ratings = synthetic_matrix(args.synthetic, 500, density=0.05)
+    else:
+        ratings = RatingMatrix.from_json(args.data)
+    run_batch(ratings, args.output, args.workers, args.block_size, args.neighbor)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Authors: Mateusz Budzyński, Igor Gutowski
+
+Benchmark of the weighted k-nearest-neighbour mode against the full-sort path of movies.py.
+
+The full-sort path sorts the similarities to all users, takes a single neighbour and sorts all
+of its ratings. The k-NN mode selects K neighbours and the best/worst predictions with
+np.argpartition. Both are measured per query on generated ratings, and their quality is
+compared on held-out ratings: one rating of every sampled user is hidden and predicted by the
+single neighbour and by the K neighbours (mean absolute error and the fraction of hidden
+ratings that could be predicted at all).
+
+Usage:
+    python benchmark.py --users 50000 --movies 500 --density 0.2 --k 20
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from ann import synthetic_matrix
+
+
+def suggest_full_sort(matrix, row, count=5):
+    """
+    The movies.suggest_movie path on a RatingMatrix: full sort of all similarities,
+    then full sort of the ratings of the chosen user.
+
+    Parameters:
+    - matrix (RatingMatrix): Ratings of all users.
+    - row (int): Row of the user.
+    - count (int): Length of both lists.
+
+    Returns:
+    tuple: (recommended movies, not recommended movies)
+    """
+    similarity = matrix.similarity_block([row])[0]
+    similarity[row] = -1
+    candidates = np.flatnonzero(similarity != -1)
+    chosen = candidates[np.argsort(similarity[candidates], kind="stable")[0]]
+    sorted_movies = matrix.user_ratings(chosen)
+    return [movie for movie, _ in sorted_movies[:count]], [movie for movie, _ in sorted_movies[-count - 1:-1]]
+
+
+def time_queries(function, rows):
+    """Mean time of one call in milliseconds."""
+    start = time.perf_counter()
+    for row in rows:
+        function(row)
+    return (time.perf_counter() - start) / len(rows) * 1000
+
+
+def held_out_error(matrix, rows, k, seed=0):
+    """
+    Hide one rating of every user and predict it with the single user of the full-sort path and with K users.
+
+    Parameters:
+    - matrix (RatingMatrix): Ratings of all users, restored after every user.
+    - rows (np.ndarray): Rows of the sampled users.
+    - k (int): Number of neighbours.
+    - seed (int): Seed of the hidden ratings.
+
+    Returns:
+    dict: mode -> (mean absolute error, coverage)
+    """
+    rng = np.random.default_rng(seed)
+    errors = {"single": [], "knn": []}
+    tried = 0
+    for row in rows:
+        rated = np.flatnonzero(matrix.mask[row])
+        if len(rated) < 2:
+            continue
+        tried += 1
+        column = rng.choice(rated)
+        rating = matrix.ratings[row, column]
+        matrix.mask[row, column], matrix._mask[row, column] = False, 0
+        matrix.ratings[row, column] = matrix._squared[row, column] = 0
+        try:
+            similarity = matrix.similarity_block([row])[0]
+            similarity[row] = -1
+            candidates = np.flatnonzero(similarity != -1)
+            neighbor = candidates[np.argsort(similarity[candidates], kind="stable")[0]] if len(candidates) else -1
+            if neighbor != -1 and matrix.mask[neighbor, column]:
+                errors["single"].append(abs(matrix.ratings[neighbor, column] - rating))
+            predicted = matrix.predict_ratings(row, k)[column]
+            if not np.isnan(predicted):
+                errors["knn"].append(abs(predicted - rating))
+        finally:
+            matrix.mask[row, column], matrix._mask[row, column] = True, 1
+            matrix.ratings[row, column], matrix._squared[row, column] = rating, rating * rating
+    return {mode: (float(np.mean(values)) if values else float("nan"), len(values) / max(tried, 1))
+            for mode, values in errors.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the k-NN recommendations with the full-sort path.")
+    parser.add_argument("--users", type=int, default=20000)
+    parser.add_argument("--movies", type=int, default=500)
+    parser.add_argument("--density", type=float, default=0.2, help="Fraction of movies rated by a user")
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    matrix = synthetic_matrix(args.users, args.movies, density=args.density)
+    rows = np.random.default_rng(1).choice(args.users, min(args.queries, args.users), replace=False)
+
+    full_sort = time_queries(lambda row: suggest_full_sort(matrix, row), rows)
+    knn = time_queries(lambda row: matrix.suggest_knn(matrix.users[row], args.k), rows)
+    print(f"full sort: {full_sort:.2f} ms/query, k-NN (k={args.k}): {knn:.2f} ms/query")
+
+    for mode, (error, coverage) in held_out_error(matrix, rows, args.k).items():
+        print(f"{mode}: held-out MAE {error:.3f}, coverage {coverage:.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+"""
+Authors: Mateusz Budzyński, Igor Gutowski
+
+Streaming loader for large ratings files.
+
+movies.py reads the whole data.json with f.read() and json.loads into nested dictionaries.
+This loader parses the same format ({user: {movie: rating}}) one user at a time, interns user
+and movie names into integer IDs and writes a compact CSR (compressed sparse row) structure
+straight to disk:
+
+    indptr.bin  - int64, ratings of user i are at indptr[i]:indptr[i + 1]
+    indices.bin - int32 movie IDs
+    data.bin    - uint8 ratings
+    users.jsonl, movies.jsonl - names in ID order, one JSON string per line
+    manifest.json - lengths, dtypes and the size/mtime of the source file
+
+Later runs open the binary files with np.memmap, so startup and memory stay flat no matter
+how big the ratings file is. The cache is rebuilt when the source file changes.
+
+Usage:
+    python loader.py data.json
+"""
+
+import argparse
+import json
+import os
+import time
+from array import array
+
+import numpy as np
+
+from recommender import DATA_FILE, RatingMatrix
+
+READ_SIZE = 1 << 20
+FLUSH_SIZE = 1 << 20  # Ratings buffered in memory before they are written to disk
+_decoder = json.JSONDecoder()
+
+
+def iter_users(path):
+    """
+    Parse a ratings file one user at a time.
+
+    Only the current user's object is kept in memory, the file is read in fixed-size blocks.
+
+    Parameters:
+    - path (str): JSON file in the movies.py format.
+
+    Yields:
+    tuple: (user name, {movie: rating})
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        buffer, position, eof = "", 0, False
+
+        def skip(position):
+            while position < len(buffer) and buffer[position] in " \t\r\n":
+                position += 1
+            return position
+
+        def parse(position):
+            # Decode one JSON value, reading more of the file until it is complete
+            nonlocal buffer, eof
+            while True:
+                try:
+                    return _decoder.raw_decode(buffer, skip(position))
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                    block = f.read(READ_SIZE)
+                    eof = not block
+                    buffer = buffer[position:] + block
+                    position = 0
+
+        def expect(position, characters):
+            nonlocal buffer, eof
+            while True:
+                position = skip(position)
+                if position < len(buffer):
+                    break
+                if eof:
+                    raise ValueError(f"Unexpected end of {path}")
+                block = f.read(READ_SIZE)
+                eof = not block
+                buffer, position = buffer[position:] + block, 0
+            if buffer[position] not in characters:
+                raise ValueError(f"Expected one of {characters!r} in {path}, got {buffer[position]!r}")
+            return buffer[position], position + 1
+
+        _, position = expect(position, "{")
+        while True:
+            character, next_position = expect(position, '"}')
+            if character == "}":
+                return
+            name, position = parse(next_position - 1)
+            _, position = expect(position, ":")
+            ratings, position = parse(position)
+            yield name, ratings
+            character, position = expect(position, ",}")
+            if character == "}":
+                return
+
+
+def build_cache(path, cache_dir):
+    """
+    Convert a ratings file into the binary CSR cache.
+
+    Parameters:
+    - path (str): JSON ratings file.
+    - cache_dir (str): Output directory.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    movie_ids = {}
+    indptr, indices, data = array("q", [0]), array("i"), array("B")
+    total = 0
+
+    with open(os.path.join(cache_dir, "indptr.bin"), "wb") as indptr_file, \
+            open(os.path.join(cache_dir, "indices.bin"), "wb") as indices_file, \
+            open(os.path.join(cache_dir, "data.bin"), "wb") as data_file, \
+            open(os.path.join(cache_dir, "users.jsonl"), "w", encoding="utf-8") as users_file:
+        users = 0
+        for name, ratings in iter_users(path):
+            users_file.write(json.dumps(name, ensure_ascii=False) + "\n")
+            users += 1
+            for movie, rating in ratings.items():
+                indices.append(movie_ids.setdefault(movie, len(movie_ids)))
+                data.append(rating)
+            total += len(ratings)
+            indptr.append(total)
+            if len(indices) >= FLUSH_SIZE:
+                indices.tofile(indices_file)
+                data.tofile(data_file)
+                indptr.tofile(indptr_file)
+                indices, data, indptr = array("i"), array("B"), array("q")
+        indices.tofile(indices_file)
+        data.tofile(data_file)
+        indptr.tofile(indptr_file)
+
+    with open(os.path.join(cache_dir, "movies.jsonl"), "w", encoding="utf-8") as f:
+        for movie in movie_ids:
+            f.write(json.dumps(movie, ensure_ascii=False) + "\n")
+
+    stat = os.stat(path)
+    manifest = {
+        "source_size": stat.st_size,
+        "source_mtime": stat.st_mtime,
+        "users": users,
+        "movies": len(movie_ids),
+        "ratings": total,
+        "dtypes": {"indptr": "int64", "indices": "int32", "data": "uint8"},
+    }
+    with open(os.path.join(cache_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+
+def _read_names(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+class RatingsCSR:
+    """
+    Memory-mapped CSR ratings from the binary cache.
+
+    Attributes:
+    - indptr (np.memmap): int64, ratings of user i are at indptr[i]:indptr[i + 1].
+    - indices (np.memmap): int32 movie IDs.
+    - data (np.memmap): uint8 ratings.
+    - manifest (dict): Content of manifest.json.
+    """
+
+    def __init__(self, cache_dir):
+        """
+        Open the cache directory.
+
+        Parameters:
+        - cache_dir (str): Directory written by build_cache.
+        """
+        self.cache_dir = cache_dir
+        with open(os.path.join(cache_dir, "manifest.json")) as f:
+            self.manifest = json.load(f)
+        self.indptr = self._map("indptr", self.manifest["users"] + 1)
+        self.indices = self._map("indices", self.manifest["ratings"])
+        self.data = self._map("data", self.manifest["ratings"])
+        self._users = self._movies = None
+
+    def _map(self, name, length):
+        dtype = self.manifest["dtypes"][name]
+        if length == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(os.path.join(self.cache_dir, name + ".bin"), dtype=dtype, mode="r", shape=(length,))
+
+    @property
+    def users(self):
+        """User names in ID order (read on first use)."""
+        if self._users is None:
+            self._users = _read_names(os.path.join(self.cache_dir, "users.jsonl"))
+        return self._users
+
+    @property
+    def movies(self):
+        """Movie titles in ID order (read on first use)."""
+        if self._movies is None:
+            self._movies = _read_names(os.path.join(self.cache_dir, "movies.jsonl"))
+        return self._movies
+
+    def __len__(self):
+        return self.manifest["users"]
+
+    def user_ratings(self, user_id):
+        """
+        Get the ratings of one user.
+
+        Parameters:
+        - user_id (int): ID of the user.
+
+        Returns:
+        dict: {movie: rating}
+        """
+        start, end = self.indptr[user_id], self.indptr[user_id + 1]
+        return {self.movies[movie]: int(rating) for movie, rating in zip(self.indices[start:end], self.data[start:end])}
+
+    def to_matrix(self, user_ids=None):
+        """
+        Build a dense RatingMatrix of all or some users.
+
+        Parameters:
+        - user_ids (array-like): IDs of the users, all users by default.
+
+        Returns:
+        RatingMatrix
+        """
+        user_ids = np.arange(len(self)) if user_ids is None else np.asarray(user_ids)
+        ratings = np.zeros((len(user_ids), self.manifest["movies"]), dtype=np.float32)
+        mask = np.zeros(ratings.shape, dtype=bool)
+        positions = np.zeros(ratings.shape, dtype=np.int32)
+        for row, user_id in enumerate(user_ids):
+            start, end = self.indptr[user_id], self.indptr[user_id + 1]
+            ratings[row, self.indices[start:end]] = self.data[start:end]
+            mask[row, self.indices[start:end]] = True
+            # The ratings of a user are stored in file order
+            positions[row, self.indices[start:end]] = np.arange(end - start)
+        return RatingMatrix([self.users[user_id] for user_id in user_ids], self.movies, ratings, mask, positions)
+
+
+def load_ratings(path, cache_dir=None):
+    """
+    Open the binary cache of a ratings file, building it first if it is missing or stale.
+
+    Parameters:
+    - path (str): JSON ratings file.
+    - cache_dir (str): Cache directory, <path>.cache by default.
+
+    Returns:
+    RatingsCSR
+    """
+    cache_dir = cache_dir or path + ".cache"
+    manifest_path = os.path.join(cache_dir, "manifest.json")
+    stat = os.stat(path)
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        if manifest["source_size"] == stat.st_size and manifest["source_mtime"] == stat.st_mtime:
+            return RatingsCSR(cache_dir)
+    build_cache(path, cache_dir)
+    return RatingsCSR(cache_dir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert a ratings file into a memory-mapped CSR cache.")
+    parser.add_argument("path", nargs="?", default=DATA_FILE)
+    parser.add_argument("--cache-dir")
+    args = parser.parse_args()
+
+    for run in ("first", "cached"):
+        start = time.perf_counter()
+        ratings = load_ratings(args.path, args.cache_dir)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"{run} load: {len(ratings)} users, {ratings.manifest['movies']} movies, "
+              f"{ratings.manifest['ratings']} ratings in {elapsed:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
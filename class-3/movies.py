@@ -40,15 +40,27 @@ def euclidean_distance(person1, person2):
     return 1 / (1 + np.sqrt(np.sum(squared_diff)))
 
 
-with open(DATA_FILE, "r", encoding="utf-8") as f:
-    data_json = json.loads(f.read())
+def load_data(path):
+    """
+    Load the ratings of all users.
+
+    Parameters:
+    - path (str): JSON file with a dictionary of users and their movie ratings.
 
-def suggest_movie(name):
+    Returns:
+    dict: {user: {movie: rating}}
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        return json.loads(f.read())
+
+
+def suggest_movie(name, data_json):
     """
     Suggest movies for a given user based on their similarity to other users.
 
     Parameters:
     - user (str): The user for whom movie suggestions are to be made.
+    - data_json (dict): Ratings of all users, see load_data.
 
     Raises:
     TypeError: If the specified user is not found in the dataset.
@@ -80,11 +92,13 @@ def suggest_movie(name):
     recommended_movies = [movie for movie, _ in sorted_movies[:5]]
     not_recommended_movies = [movie for movie, _ in sorted_movies[-6:-1]]
     
-    print(NAME)
+    print(name)
     print("Rekomendowane:")
     print(recommended_movies)
     print("Nierekomendowane:")
     print(not_recommended_movies)
 
 
-suggest_movie(NAME)
+if __name__ == "__main__":
+    suggest_movie(NAME, load_data(DATA_FILE))
+
@@ -0,0 +1,273 @@
+"""
+Authors: Mateusz Budzyński, Igor Gutowski
+
+Precomputed top-K user-similarity index with incremental updates.
+
+The index keeps the K most similar users of every user (similarity from movies.euclidean_distance,
+users without common movies are never neighbours), and the BASELINE neighbour of every user
+(the least similar user with common movies, like movies.suggest_movie, see
+recommender.select_neighbor). Recommendations are served from the index without computing any
+similarity, for both neighbour conventions.
+
+When one rating is added or changed, only the similarities to that user change:
+    - the row of the user is recomputed,
+    - other users get the user inserted into (or its score updated in) their lists, and it becomes
+      their baseline neighbour if it is now the least similar one,
+    - only users whose list contained the user and whose similarity to it dropped (or whose
+      baseline neighbour it was and whose similarity to it grew) are recomputed, because another
+      user may now take its place.
+
+The index is saved together with the rating matrix to one .npz file, so a warm restart
+doesn't recompute anything.
+"""
+
+import time
+
+import numpy as np
+
+from recommender import BASELINE, DATA_FILE, NAME, NEIGHBORS, RatingMatrix, select_neighbor
+
+
+class NeighborIndex:
+    """
+    Top-K most similar users of every user.
+
+    Attributes:
+    - matrix (RatingMatrix): Ratings the index is built from.
+    - k (int): Number of neighbours per user.
+    - neighbors (np.ndarray): users x k rows of the neighbours, most similar first (equal ones by row),
+      -1 for empty slots.
+    - scores (np.ndarray): users x k similarities of the neighbours, -inf for empty slots.
+    - baseline (np.ndarray): Row of the BASELINE neighbour of every user, -1 if there is none.
+    - baseline_scores (np.ndarray): Similarity of the BASELINE neighbours, inf if there is none.
+    """
+
+    def __init__(self, matrix, k=10, block_size=1024):
+        """
+        Build the index.
+
+        Parameters:
+        - matrix (RatingMatrix): Ratings of all users.
+        - k (int): Number of neighbours per user.
+        - block_size (int): Number of users whose similarities are computed at once.
+        """
+        self.matrix = matrix
+        self.k = k
+        self.neighbors = np.full((len(matrix.users), k), -1, dtype=np.int64)
+        self.scores = np.full((len(matrix.users), k), -np.inf)
+        self.baseline = np.full(len(matrix.users), -1, dtype=np.int64)
+        self.baseline_scores = np.full(len(matrix.users), np.inf)
+        for start, block in matrix.iter_similarity_blocks(block_size):
+            self._set_rows(np.arange(start, start + len(block)), block)
+
+    def _set_rows(self, rows, similarity):
+        """
+        Select the top-K and the BASELINE neighbours of some users from their similarity rows.
+
+        Parameters:
+        - rows (np.ndarray): Rows of the users.
+        - similarity (np.ndarray): len(rows) x users similarities.
+        """
+        similarity = similarity.copy()
+        similarity[np.arange(len(rows)), rows] = -1  # A user is not its own neighbour
+        baseline = select_neighbor(similarity, BASELINE)
+        self.baseline[rows] = baseline
+        self.baseline_scores[rows] = np.where(baseline != -1, similarity[np.arange(len(rows)), baseline], np.inf)
+        similarity[similarity == -1] = -np.inf
+
+        k = min(self.k, similarity.shape[1])
+        # The K best, of the ones equal to the K-th best the lowest rows, so the index doesn't
+        # depend on how argpartition orders equal scores
+        kth = -np.partition(-similarity, k - 1, axis=1)[:, k - 1:k]
+        above, equal = similarity > kth, similarity == kth
+        selected = above | (equal & (np.cumsum(equal, axis=1) <= k - above.sum(axis=1, keepdims=True)))
+        top = np.nonzero(selected)[1].reshape(len(rows), k)
+        top_scores = np.take_along_axis(similarity, top, axis=1)
+        order = np.lexsort((top, -top_scores), axis=-1)
+        top, top_scores = np.take_along_axis(top, order, axis=1), np.take_along_axis(top_scores, order, axis=1)
+
+        self.neighbors[rows] = -1
+        self.scores[rows] = -np.inf
+        self.neighbors[rows, :k] = np.where(np.isinf(top_scores), -1, top)
+        self.scores[rows, :k] = top_scores
+
+    def update_rating(self, name, movie, rating):
+        """
+        Add or change one rating and update the affected rows of the index.
+
+        Parameters:
+        - name (str): User name.
+        - movie (str): Movie title.
+        - rating (int): Rating of the movie.
+
+        Returns:
+        int: Number of rows that were recomputed from scratch.
+        """
+        users = len(self.matrix.users)
+        row, _ = self.matrix.set_rating(name, movie, rating)
+        if len(self.matrix.users) > users:
+            self.neighbors = np.vstack([self.neighbors, np.full((1, self.k), -1, dtype=np.int64)])
+            self.scores = np.vstack([self.scores, np.full((1, self.k), -np.inf)])
+            self.baseline = np.append(self.baseline, -1)
+            self.baseline_scores = np.append(self.baseline_scores, np.inf)
+
+        similarity = self.matrix.similarity_block([row])
+        self._set_rows(np.array([row]), similarity)
+        similarity = similarity[0]
+        similarity[similarity == -1] = -np.inf
+        similarity[row] = -np.inf
+
+        others = np.flatnonzero(np.arange(len(self.matrix.users)) != row)
+        contains = self.neighbors[others] == row
+        had_user = contains.any(axis=1)
+        old_scores = np.where(contains, self.scores[others], -np.inf).max(axis=1)
+
+        # Similarity dropped for users that had it as a neighbour - someone else may be better now
+        dirty = others[had_user & (similarity[others] < old_scores)]
+
+        # BASELINE: similarity grew (or the user has no common movies any more) for users whose
+        # baseline neighbour it was - someone else may be less similar now
+        valid = np.isfinite(similarity[others])
+        was_baseline = self.baseline[others] == row
+        still_lowest = valid & (similarity[others] <= self.baseline_scores[others])
+        baseline_dirty = others[was_baseline & ~still_lowest]
+        kept = others[was_baseline & still_lowest]
+        self.baseline_scores[kept] = similarity[kept]
+        # Less similar than the current baseline neighbour (equal ones go to the lowest row)
+        lower = others[~was_baseline & valid & (
+            (similarity[others] < self.baseline_scores[others])
+            | ((similarity[others] == self.baseline_scores[others]) & (row < self.baseline[others]))
+        )]
+        self.baseline[lower] = row
+        self.baseline_scores[lower] = similarity[lower]
+        dirty = np.union1d(dirty, baseline_dirty)
+
+        # Similarity grew or stayed - update the score in place
+        grew = others[had_user & (similarity[others] >= old_scores)]
+        positions = np.argmax(self.neighbors[grew] == row, axis=1)
+        self.scores[grew, positions] = similarity[grew]
+
+        # New neighbour - replace the worst one if it is better (or as good and in a lower row)
+        candidates = others[~had_user & (
+            (similarity[others] > self.scores[others, -1])
+            | ((similarity[others] == self.scores[others, -1]) & (row < self.neighbors[others, -1]))
+        )]
+        self.neighbors[candidates, -1] = row
+        self.scores[candidates, -1] = similarity[candidates]
+
+        changed = np.concatenate([grew, candidates])
+        order = np.lexsort((self.neighbors[changed], -self.scores[changed]), axis=-1)
+        self.neighbors[changed] = np.take_along_axis(self.neighbors[changed], order, axis=1)
+        self.scores[changed] = np.take_along_axis(self.scores[changed], order, axis=1)
+
+        if len(dirty):
+            self._set_rows(dirty, self.matrix.similarity_block(dirty))
+        return len(dirty) + 1
+
+    def neighbors_of(self, name):
+        """
+        Get the most similar users of a user.
+
+        Parameters:
+        - name (str): User name.
+
+        Returns:
+        list: (user, similarity) pairs, most similar first.
+
+        Raises:
+        TypeError: If the specified user is not found in the dataset.
+        """
+        if name not in self.matrix.user_index:
+            raise TypeError(f"Cannot find {name} in the dataset")
+        row = self.matrix.user_index[name]
+        return [
+            (self.matrix.users[neighbor], float(score))
+            for neighbor, score in zip(self.neighbors[row], self.scores[row])
+            if neighbor != -1
+        ]
+
+    def suggest(self, name, neighbor=BASELINE):
+        """
+        Suggest the best and worst rated movies of the neighbour of a user, like
+        RatingMatrix.suggest, straight from the index.
+
+        Parameters:
+        - name (str): User name.
+        - neighbor (str): BASELINE or MOST_SIMILAR, see recommender.select_neighbor.
+
+        Returns:
+        tuple: (5 recommended movies, 5 not recommended movies)
+
+        Raises:
+        TypeError: If the specified user is not found or has no similar users.
+        """
+        if neighbor not in NEIGHBORS:
+            raise ValueError(f"Unknown neighbor {neighbor}, expected one of {NEIGHBORS}")
+        neighbors = self.neighbors_of(name)
+        if not neighbors:
+            raise TypeError(f"{name} has no common movies with other users")
+        row = self.matrix.user_index[name]
+        chosen = self.baseline[row] if neighbor == BASELINE else self.neighbors[row, 0]
+        sorted_movies = self.matrix.user_ratings(chosen)
+        recommended_movies = [movie for movie, _ in sorted_movies[:5]]
+        not_recommended_movies = [movie for movie, _ in sorted_movies[-6:-1]]
+        return recommended_movies, not_recommended_movies
+
+    def save(self, path):
+        """
+        Save the index and the rating matrix to a .npz file.
+
+        Parameters:
+        - path (str): Output file.
+        """
+        np.savez(
+            path,
+            users=np.array(self.matrix.users),
+            movies=np.array(self.matrix.movies),
+            ratings=self.matrix.ratings,
+            mask=self.matrix.mask,
+            positions=self.matrix.positions,
+            neighbors=self.neighbors,
+            scores=self.scores,
+            baseline=self.baseline,
+            baseline_scores=self.baseline_scores,
+        )
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load an index saved with save, without computing any similarity.
+
+        Parameters:
+        - path (str): File saved with save.
+
+        Returns:
+        NeighborIndex
+        """
+        with np.load(path) as data:
+            index = cls.__new__(cls)
+            index.matrix = RatingMatrix(data["users"].tolist(), data["movies"].tolist(), data["ratings"], data["mask"], data["positions"])
+            index.neighbors = data["neighbors"]
+            index.scores = data["scores"]
+            index.baseline = data["baseline"]
+            index.baseline_scores = data["baseline_scores"]
+            index.k = index.neighbors.shape[1]
+        return index
+
+
+if __name__ == "__main__":
+    start = time.perf_counter()
+    index = NeighborIndex(RatingMatrix.from_json(DATA_FILE), k=5)
+    print(f"Built index of {len(index.matrix.users)} users in {(time.perf_counter() - start) * 1000:.1f} ms")
+    index.save("neighbors.npz")
+
+    start = time.perf_counter()
+    index = NeighborIndex.load("neighbors.npz")
+    print(f"Loaded index in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    print(NAME, index.neighbors_of(NAME))
+    recommended_movies, not_recommended_movies = index.suggest(NAME)
+    print("Rekomendowane:")
+    print(recommended_movies)
+    print("Nierekomendowane:")
+    print(not_recommended_movies)
@@ -0,0 +1,414 @@
+"""
+Authors: Mateusz Budzyński, Igor Gutowski
+
+Vectorized movie recommendation engine.
+
+The ratings are loaded once into a dense user x movie NumPy matrix with a mask of rated
+movies. The similarity of two users is the same as movies.euclidean_distance:
+1 / (1 + sqrt(sum of squared differences over common movies)), or -1 if they have no
+common movies. Squared distances of many users are computed at once with matrix products:
+
+    d2(u, v) = sum(m_u * m_v * (r_u - r_v)^2) = (R^2 @ M.T + M @ (R^2).T - 2 R @ R.T)(u, v)
+
+where R holds the ratings (0 for missing) and M is the mask. Users are processed in blocks,
+so the memory of the all-pairs matrix is bounded by block_size x users.
+
+The neighbour whose ratings are suggested is chosen the same way by RatingMatrix.suggest,
+batch.py and neighbors.NeighborIndex.suggest, see select_neighbor:
+    - BASELINE (the default) - the user movies.suggest_movie picks: it sorts the similarities
+      in ascending order and takes the first one, so this is the LEAST similar user with common
+      movies. It is kept as the default, so the lists are the same as the ones of movies.py.
+    - MOST_SIMILAR - the most similar user, what the comments of movies.py describe.
+Equal similarities go to the user with the lowest row (the first one in data.json).
+"""
+
+import json
+import time
+
+import numpy as np
+
+"""
+Configuration:
+DATA_FILE - file with data in JSON format
+NAME - username from data file
+"""
+DATA_FILE = "data.json"
+NAME = "Igor Gutowski"
+
+BASELINE = "baseline"
+MOST_SIMILAR = "most_similar"
+NEIGHBORS = (BASELINE, MOST_SIMILAR)
+
+
+def select_neighbor(similarity, neighbor=BASELINE):
+    """
+    Choose the neighbour whose ratings are suggested, see the module docstring.
+
+    Parameters:
+    - similarity (np.ndarray): Similarities of one user (1D) or of a block of users (2D, one row
+      per user), -1 for users that can't be chosen (no common movies, the user itself).
+    - neighbor (str): BASELINE or MOST_SIMILAR.
+
+    Returns:
+    int or np.ndarray: Column of the neighbour (of every row), -1 if there is none.
+    """
+    if neighbor not in NEIGHBORS:
+        raise ValueError(f"Unknown neighbor {neighbor}, expected one of {NEIGHBORS}")
+    valid = similarity != -1
+    if neighbor == BASELINE:
+        chosen = np.argmin(np.where(valid, similarity, np.inf), axis=-1)
+    else:
+        chosen = np.argmax(np.where(valid, similarity, -np.inf), axis=-1)
+    # argmin and argmax return the first of the equal values
+    return np.where(np.any(valid, axis=-1), chosen, -1)
+
+
+class RatingMatrix:
+    """
+    Dense user x movie rating matrix with a mask.
+
+    Attributes:
+    - users (list): User names, row order of the matrix.
+    - movies (list): Movie titles, column order of the matrix.
+    - user_index (dict): User name -> row.
+    - movie_index (dict): Movie title -> column.
+    - ratings (np.ndarray): float32 users x movies ratings, 0 where the user didn't rate the movie.
+    - mask (np.ndarray): bool users x movies, True where the user rated the movie.
+    - positions (np.ndarray): int32 users x movies, position of the movie in the user's own
+      ratings (the order of the JSON object), used to break ties like movies.suggest_movie.
+    """
+
+    def __init__(self, users, movies, ratings, mask, positions=None):
+        self.users = list(users)
+        self.movies = list(movies)
+        self.user_index = {user: row for row, user in enumerate(self.users)}
+        self.movie_index = {movie: column for column, movie in enumerate(self.movies)}
+        self.ratings = np.asarray(ratings, dtype=np.float32)
+        self.mask = np.asarray(mask, dtype=bool)
+        if positions is None:
+            # Without the original order, ties keep the column order
+            positions = np.broadcast_to(np.arange(len(self.movies), dtype=np.int32), self.mask.shape)
+        self.positions = np.array(positions, dtype=np.int32)
+        self._prepare()
+
+    def _prepare(self):
+        """Precompute the float versions of the mask and squared ratings used by the matrix products."""
+        self.ratings *= self.mask
+        self._mask = self.mask.astype(np.float32)
+        self._squared = np.square(self.ratings)
+
+    @classmethod
+    def from_prepared(cls, users, movies, arrays):
+        """
+        Wrap already prepared arrays without copying them (e.g. arrays in shared memory).
+
+        Parameters:
+        - users (list): User names.
+        - movies (list): Movie titles.
+        - arrays (dict): ratings, mask, positions, mask_float and squared arrays, as returned by prepared_arrays.
+
+        Returns:
+        RatingMatrix
+        """
+        matrix = cls.__new__(cls)
+        matrix.users = list(users)
+        matrix.movies = list(movies)
+        matrix.user_index = {user: row for row, user in enumerate(matrix.users)}
+        matrix.movie_index = {movie: column for column, movie in enumerate(matrix.movies)}
+        matrix.ratings, matrix.mask, matrix.positions = arrays["ratings"], arrays["mask"], arrays["positions"]
+        matrix._mask, matrix._squared = arrays["mask_float"], arrays["squared"]
+        return matrix
+
+    def prepared_arrays(self):
+        """
+        Returns:
+        dict: The arrays used by the similarity computations, see from_prepared.
+        """
+        return {
+            "ratings": self.ratings,
+            "mask": self.mask,
+            "positions": self.positions,
+            "mask_float": self._mask,
+            "squared": self._squared,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Build the matrix from the movies.py data format.
+
+        Parameters:
+        - data (dict): {user: {movie: rating}}
+
+        Returns:
+        RatingMatrix
+        """
+        users = list(data)
+        movie_index = {}
+        for ratings in data.values():
+            for movie in ratings:
+                movie_index.setdefault(movie, len(movie_index))
+
+        matrix = np.zeros((len(users), len(movie_index)), dtype=np.float32)
+        mask = np.zeros(matrix.shape, dtype=bool)
+        positions = np.zeros(matrix.shape, dtype=np.int32)
+        for row, user in enumerate(users):
+            columns = [movie_index[movie] for movie in data[user]]
+            matrix[row, columns] = list(data[user].values())
+            mask[row, columns] = True
+            positions[row, columns] = np.arange(len(columns))
+        return cls(users, movie_index, matrix, mask, positions)
+
+    @classmethod
+    def from_json(cls, path):
+        """
+        Load the matrix from a JSON file in the movies.py data format.
+
+        Parameters:
+        - path (str): JSON file.
+
+        Returns:
+        RatingMatrix
+        """
+        with open(path, "r", encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
+
+    def set_rating(self, name, movie, rating):
+        """
+        Add or change one rating, new users and movies get a new row or column.
+
+        Parameters:
+        - name (str): User name.
+        - movie (str): Movie title.
+        - rating (int): Rating of the movie.
+
+        Returns:
+        tuple: (row, column) of the rating.
+        """
+        if movie not in self.movie_index:
+            self.movie_index[movie] = len(self.movies)
+            self.movies.append(movie)
+            self._grow(((0, 0), (0, 1)))
+        if name not in self.user_index:
+            self.user_index[name] = len(self.users)
+            self.users.append(name)
+            self._grow(((0, 1), (0, 0)))
+
+        row, column = self.user_index[name], self.movie_index[movie]
+        if not self.mask[row, column]:
+            # A new rating goes to the end of the user's ratings, like a new key of a dict
+            self.positions[row, column] = self.positions[row, self.mask[row]].max(initial=-1) + 1
+        self.ratings[row, column] = rating
+        self.mask[row, column] = True
+        self._mask[row, column] = 1
+        self._squared[row, column] = rating * rating
+        return row, column
+
+    def _grow(self, padding):
+        """Add empty rows or columns to all matrices."""
+        self.ratings = np.pad(self.ratings, padding)
+        self.mask = np.pad(self.mask, padding)
+        self.positions = np.pad(self.positions, padding)
+        self._mask = np.pad(self._mask, padding)
+        self._squared = np.pad(self._squared, padding)
+
+    def similarity_block(self, rows):
+        """
+        Calculate the similarity of some users to all users.
+
+        Parameters:
+        - rows (array-like): Row indices of the users.
+
+        Returns:
+        np.ndarray: len(rows) x users similarities, -1 where two users have no common movies.
+        """
+        ratings, mask, squared = self.ratings[rows], self._mask[rows], self._squared[rows]
+        distance = squared @ self._mask.T + mask @ self._squared.T - 2 * (ratings @ self.ratings.T)
+        common = mask @ self._mask.T
+        similarity = 1 / (1 + np.sqrt(np.maximum(distance.astype(np.float64), 0)))
+        similarity[common == 0] = -1
+        return similarity
+
+    def pair_similarities(self, row, others):
+        """
+        Calculate the similarity of one user to some users.
+
+        Parameters:
+        - row (int): Row of the user.
+        - others (np.ndarray): Rows of the other users.
+
+        Returns:
+        np.ndarray: Similarities in the order of others, -1 where there are no common movies.
+        """
+        mask = self._mask[others]
+        distance = mask @ self._squared[row] + self._squared[others] @ self._mask[row] - 2 * (self.ratings[others] @ self.ratings[row])
+        similarity = 1 / (1 + np.sqrt(np.maximum(distance.astype(np.float64), 0)))
+        similarity[mask @ self._mask[row] == 0] = -1
+        return similarity
+
+    def similarities(self, name):
+        """
+        Calculate the similarity of one user to all users (including the user itself).
+
+        Parameters:
+        - name (str): User name.
+
+        Returns:
+        np.ndarray: Similarities in users order, -1 where there are no common movies.
+
+        Raises:
+        TypeError: If the specified user is not found in the dataset.
+        """
+        if name not in self.user_index:
+            raise TypeError(f"Cannot find {name} in the dataset")
+        return self.similarity_block([self.user_index[name]])[0]
+
+    def iter_similarity_blocks(self, block_size=1024):
+        """
+        Calculate the similarities of all pairs of users, block by block.
+
+        Parameters:
+        - block_size (int): Number of users in one block.
+
+        Yields:
+        tuple: (first row of the block, block_size x users similarities)
+        """
+        for start in range(0, len(self.users), block_size):
+            yield start, self.similarity_block(np.arange(start, min(start + block_size, len(self.users))))
+
+    def all_similarities(self, block_size=1024):
+        """
+        Calculate the users x users similarity matrix.
+
+        Parameters:
+        - block_size (int): Number of users computed at once.
+
+        Returns:
+        np.ndarray: users x users similarities.
+        """
+        result = np.empty((len(self.users), len(self.users)))
+        for start, block in self.iter_similarity_blocks(block_size):
+            result[start:start + len(block)] = block
+        return result
+
+    def user_ratings(self, row):
+        """
+        Get the movies rated by a user, best first, equal ratings in the user's own order
+        (like the stable sort of movies.suggest_movie).
+
+        Parameters:
+        - row (int): Row of the user.
+
+        Returns:
+        list: (movie, rating) pairs.
+        """
+        columns = np.flatnonzero(self.mask[row])
+        order = columns[np.lexsort((self.positions[row, columns], -self.ratings[row, columns]))]
+        return [(self.movies[column], int(self.ratings[row, column])) for column in order]
+
+    def suggest(self, name, neighbor=BASELINE):
+        """
+        Suggest the best and worst rated movies of the neighbour of a user, with the default
+        BASELINE neighbour the same lists as movies.suggest_movie.
+
+        Parameters:
+        - name (str): User name.
+        - neighbor (str): BASELINE or MOST_SIMILAR, see select_neighbor.
+
+        Returns:
+        tuple: (5 recommended movies, 5 not recommended movies)
+
+        Raises:
+        TypeError: If the specified user is not found or has no common movies with other users.
+        """
+        similarity = self.similarities(name)
+        similarity[self.user_index[name]] = -1
+        chosen = select_neighbor(similarity, neighbor)
+        if chosen == -1:
+            raise TypeError(f"{name} has no common movies with other users")
+
+        sorted_movies = self.user_ratings(chosen)
+        recommended_movies = [movie for movie, _ in sorted_movies[:5]]
+        not_recommended_movies = [movie for movie, _ in sorted_movies[-6:-1]]
+        return recommended_movies, not_recommended_movies
+
+    def predict_ratings(self, row, k=10):
+        """
+        Predict the ratings of a user from its K most similar users.
+
+        The prediction of a movie is the similarity-weighted mean of the ratings of the
+        neighbours who rated it. Neighbours are selected with np.argpartition, without
+        sorting all users.
+
+        Parameters:
+        - row (int): Row of the user.
+        - k (int): Number of neighbours.
+
+        Returns:
+        np.ndarray: Predicted rating of every movie, NaN for movies the user already rated
+        or none of the neighbours rated.
+        """
+        similarity = self.similarity_block([row])[0]
+        similarity[row] = -1
+        candidates = np.flatnonzero(similarity != -1)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-similarity[candidates], k - 1)[:k]]
+        weights = similarity[candidates].astype(np.float32)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            predicted = (weights @ self.ratings[candidates]) / (weights @ self._mask[candidates])
+        predicted[self.mask[row]] = np.nan
+        return predicted
+
+    def suggest_knn(self, name, k=10, count=5):
+        """
+        Suggest movies the user hasn't rated yet from the predictions of its K most similar users.
+
+        Parameters:
+        - name (str): User name.
+        - k (int): Number of neighbours.
+        - count (int): Length of both lists.
+
+        Returns:
+        tuple: (recommended movies, not recommended movies), best and worst predictions first.
+
+        Raises:
+        TypeError: If the specified user is not found in the dataset.
+        """
+        if name not in self.user_index:
+            raise TypeError(f"Cannot find {name} in the dataset")
+        predicted = self.predict_ratings(self.user_index[name], k)
+        columns = np.flatnonzero(~np.isnan(predicted))
+        return self._select(columns, -predicted[columns], count), self._select(columns, predicted[columns], count)
+
+    def _select(self, columns, keys, count):
+        """Titles of the count columns with the smallest keys, in key order (ties in column order)."""
+        if len(columns) > count:
+            top = np.argpartition(keys, count - 1)[:count]
+            top = top[np.lexsort((columns[top], keys[top]))]
+        else:
+            top = np.lexsort((columns, keys))
+        return [self.movies[column] for column in columns[top]]
+
+
+if __name__ == "__main__":
+    start = time.perf_counter()
+    matrix = RatingMatrix.from_json(DATA_FILE)
+    print(f"Loaded {len(matrix.users)} users x {len(matrix.movies)} movies in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    recommended_movies, not_recommended_movies = matrix.suggest(NAME)
+    print(NAME)
+    print("Rekomendowane:")
+    print(recommended_movies)
+    print("Nierekomendowane:")
+    print(not_recommended_movies)
+
+    recommended_movies, not_recommended_movies = matrix.suggest_knn(NAME)
+    print("Rekomendowane (k najbliższych sąsiadów):")
+    print(recommended_movies)
+    print("Nierekomendowane (k najbliższych sąsiadów):")
+    print(not_recommended_movies)
+
+    start = time.perf_counter()
+    matrix.all_similarities()
+    print(f"All-pairs similarities in {(time.perf_counter() - start) * 1000:.1f} ms")
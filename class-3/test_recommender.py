@@ -0,0 +1,72 @@
+"""
+Authors: Mateusz Budzyński, Igor Gutowski
+
+Tests of the vectorized recommender against movies.py.
+"""
+
+import os
+import random
+
+import numpy as np
+import pytest
+
+import batch
+import movies
+from neighbors import NeighborIndex
+from recommender import BASELINE, MOST_SIMILAR, RatingMatrix
+
+DATA = movies.load_data(os.path.join(os.path.dirname(__file__), "data.json"))
+
+
+def reference_suggestions(name, capsys):
+    """Recommended and not recommended movies printed by movies.suggest_movie."""
+    movies.suggest_movie(name, DATA)
+    lines = capsys.readouterr().out.splitlines()
+    return lines[2], lines[4]
+
+
+@pytest.mark.parametrize("name", list(DATA))
+def test_suggest_matches_movies(name, capsys):
+    recommended, not_recommended = RatingMatrix.from_dict(DATA).suggest(name)
+    assert (str(recommended), str(not_recommended)) == reference_suggestions(name, capsys)
+
+
+def test_new_rating_goes_last_among_ties():
+    matrix = RatingMatrix.from_dict({"a": {"x": 5, "y": 3}, "b": {"y": 5}})
+    matrix.set_rating("b", "x", 5)
+    assert matrix.user_ratings(matrix.user_index["b"]) == [("y", 5.0), ("x", 5.0)]
+
+
+def test_batch_matches_movies(tmp_path, capsys):
+    matrix = RatingMatrix.from_dict(DATA)
+    recommended, not_recommended = batch.run_batch(matrix, str(tmp_path / "recommendations.npz"), workers=2, block_size=4)
+    capsys.readouterr()
+    for row, name in enumerate(matrix.users):
+        lists = [[matrix.movies[column] for column in columns if column >= 0] for columns in (recommended[row], not_recommended[row])]
+        assert tuple(map(str, lists)) == reference_suggestions(name, capsys)
+
+
+@pytest.mark.parametrize("neighbor", [BASELINE, MOST_SIMILAR])
+def test_neighbor_convention_is_shared(neighbor, tmp_path, capsys):
+    matrix = RatingMatrix.from_dict(DATA)
+    index = NeighborIndex(matrix, k=3)
+    recommended, not_recommended = batch.run_batch(matrix, str(tmp_path / "recommendations.npz"), 1, 16, neighbor)
+    for row, name in enumerate(matrix.users):
+        lists = [[matrix.movies[column] for column in columns if column >= 0] for columns in (recommended[row], not_recommended[row])]
+        assert matrix.suggest(name, neighbor) == index.suggest(name, neighbor) == tuple(lists)
+
+
+def test_index_updates_match_rebuild():
+    index = NeighborIndex(RatingMatrix.from_dict(DATA), k=3)
+    rng = random.Random(0)
+    for step in range(300):
+        # Mostly existing users and movies, sometimes a new one
+        users = index.matrix.users if rng.random() < 0.95 else [f"new user {step}"]
+        titles = index.matrix.movies if rng.random() < 0.95 else [f"new movie {step}"]
+        index.update_rating(rng.choice(users), rng.choice(titles), rng.randint(1, 10))
+
+        rebuilt = NeighborIndex(index.matrix, k=3)
+        np.testing.assert_array_equal(index.neighbors, rebuilt.neighbors)
+        np.testing.assert_allclose(index.scores, rebuilt.scores)
+        np.testing.assert_array_equal(index.baseline, rebuilt.baseline)
+        np.testing.assert_allclose(index.baseline_scores, rebuilt.baseline_scores)
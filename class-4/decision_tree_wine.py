@@ -11,6 +11,7 @@ from sklearn.metrics import classification_report
 from sklearn.model_selection import train_test_split 
 from sklearn.tree import DecisionTreeClassifier
 
+from utils.export_model import export_model
 from utils.visualize_classifier import visualize_classifier
 
 from sklearn import datasets
@@ -32,12 +33,15 @@ clf.fit(X_train, y_train)
 
 y_pred = clf.predict(X_test)
 
+#export model for utils/fast_predict.py
+export_model(clf, "wine_decision_tree.npz")
+
 #generate report
 print("TRAIN")
 print(classification_report(y_train, clf.predict(X_train)))
 print("TEST")
 print(classification_report(y_test, y_pred))
 
-visualize_classifier(clf, X_train, y_train, "TRAIN")
+visualize_classifier(clf, X_train, y_train, "TRAIN", tiled=True)
 
-visualize_classifier(clf, X_test, y_test, "TEST")
+visualize_classifier(clf, X_test, y_test, "TEST", tiled=True)
@@ -10,6 +10,9 @@ import numpy as np
 import matplotlib.pyplot as plt
 from sklearn import svm, datasets
 
+from utils.export_model import export_model
+from utils.visualize_classifier import predict_mesh_adaptive
+
 # load dataset
 wine = datasets.load_wine()
 
@@ -21,6 +24,9 @@ y = wine.target
 C = 1.0
 svc = svm.SVC(kernel="linear", C=C).fit(X, y)
 
+# export model for utils/fast_predict.py
+export_model(svc, "wine_svm.npz")
+
 
 markers = ("o", "x", "s")
 
@@ -30,19 +36,18 @@ x2_min, x2_max = X[:, 1].min() - 1, X[:, 1].max() + 1
 
 res = (x1_max / x1_min) / 100
 
-# create a mesh
-xx1, xx2 = np.meshgrid(
-    np.arange(x1_min, x1_max, res), np.arange(x2_min, x2_max, res)
-)
-Z = svc.predict(np.c_[xx1.ravel(), xx2.ravel()])
-Z = Z.reshape(xx1.shape)
+# create a mesh, predicted only around the decision boundary
+x1_values, x2_values = np.arange(x1_min, x1_max, res), np.arange(x2_min, x2_max, res)
+Z, stats = predict_mesh_adaptive(svc, x1_values, x2_values)
+print(f"{stats['predicted_points']} of {stats['points']} mesh points predicted "
+      f"({stats['predicted_points'] / stats['points']:.1%}) in {stats['predict_calls']} predict calls")
 
 # generate plot
-plt.contourf(xx1, xx2, Z, alpha=0.4)
+plt.contourf(x1_values, x2_values, Z, alpha=0.4)
 
-plt.xlim(xx1.min(), xx1.max())
+plt.xlim(x1_values.min(), x1_values.max())
 
-plt.ylim(xx2.min(), xx2.max())
+plt.ylim(x2_values.min(), x2_values.max())
 
 for idx, cl in enumerate(np.unique(y)):
     plt.scatter(
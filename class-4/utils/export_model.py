@@ -0,0 +1,78 @@
+"""
+Authors: Mateusz Budzyński, Igor Gutowski
+
+Export of the fitted wine classifiers to flat NumPy arrays for utils/fast_predict.py.
+
+    - DecisionTreeClassifier - node arrays (children, feature, threshold) and the class of every
+      node. Leaves point to themselves, so the predictor can walk all samples max_depth times
+      without checking which of them already reached a leaf.
+    - SVC(kernel="linear") - one weight row and intercept per pair of classes (one-vs-one), with
+      the pairs in the order libsvm votes on them.
+    - LinearSVC / linear one-vs-rest models - one weight row and intercept per class.
+
+The arrays are saved to one uncompressed .npz file, which loads without sklearn.
+"""
+
+from itertools import combinations
+
+import numpy as np
+
+
+def export_arrays(classifier):
+    """
+    Convert a fitted classifier to flat arrays.
+
+    Parameters:
+    - classifier: Fitted DecisionTreeClassifier, linear SVC or LinearSVC.
+
+    Returns:
+    dict: Arrays of the model, see load_model in utils/fast_predict.py.
+
+    Raises:
+    TypeError: If the classifier is not supported.
+    """
+    classes = np.asarray(classifier.classes_)
+    features = np.array(classifier.n_features_in_)
+
+    if hasattr(classifier, "tree_"):
+        tree = classifier.tree_
+        nodes = np.arange(tree.node_count)
+        leaf = tree.children_left == -1
+        return {
+            "kind": np.array("tree"),
+            "classes": classes,
+            "features": features,
+            "left": np.where(leaf, nodes, tree.children_left).astype(np.int32),
+            "right": np.where(leaf, nodes, tree.children_right).astype(np.int32),
+            "feature": np.where(leaf, 0, tree.feature).astype(np.int32),
+            "threshold": np.where(leaf, np.inf, tree.threshold),
+            "node_class": np.argmax(tree.value[:, 0, :], axis=1).astype(np.int32),
+            "depth": np.array(tree.max_depth),
+        }
+
+    if getattr(classifier, "kernel", "linear") != "linear" or not hasattr(classifier, "coef_"):
+        raise TypeError(f"Cannot export {type(classifier).__name__}, only decision trees and linear SVMs are supported")
+
+    weights, intercepts = np.asarray(classifier.coef_, dtype=np.float64), np.asarray(classifier.intercept_, dtype=np.float64)
+    if hasattr(classifier, "support_") and len(classes) > 2:
+        return {
+            "kind": np.array("linear_ovo"),
+            "classes": classes,
+            "features": features,
+            "weights": weights,
+            "intercepts": intercepts,
+            "pairs": np.array(list(combinations(range(len(classes)), 2)), dtype=np.int32),
+        }
+    # Binary models have one row, positive decisions mean the second class
+    return {"kind": np.array("linear_ovr"), "classes": classes, "features": features, "weights": weights, "intercepts": intercepts}
+
+
+def export_model(classifier, path):
+    """
+    Save a fitted classifier for utils/fast_predict.py.
+
+    Parameters:
+    - classifier: Fitted DecisionTreeClassifier, linear SVC or LinearSVC.
+    - path (str): Output .npz file.
+    """
+    np.savez(path, **export_arrays(classifier))
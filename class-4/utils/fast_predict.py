@@ -0,0 +1,99 @@
+"""
+Authors: Mateusz Budzyński, Igor Gutowski
+
+Dependency-light predictor for models exported with utils/export_model.py.
+
+Only NumPy is imported, loading a model is one np.load of a small .npz file. Batches are
+evaluated vectorized:
+    - trees - all samples descend one level per step, max_depth steps,
+    - linear one-vs-one SVMs - one matrix product for all pairs of classes, then the votes,
+    - linear one-vs-rest models - one matrix product and argmax.
+
+Usage:
+    python -m utils.fast_predict wine_svm.npz
+"""
+
+import sys
+import time
+
+import numpy as np
+
+
+class FastPredictor:
+    """
+    Model exported with utils/export_model.py.
+
+    Attributes:
+    - kind (str): tree, linear_ovo or linear_ovr.
+    - classes (np.ndarray): Class labels.
+    - features (int): Number of features.
+    - arrays (dict): Arrays of the model.
+    """
+
+    def __init__(self, arrays):
+        self.arrays = arrays
+        self.kind = str(arrays["kind"])
+        self.classes = arrays["classes"]
+        self.features = int(arrays["features"])
+
+    def predict(self, X):
+        """
+        Predict the classes of a batch of samples.
+
+        Parameters:
+        - X (np.ndarray): samples x features.
+
+        Returns:
+        np.ndarray: Class labels.
+        """
+        X = np.atleast_2d(np.asarray(X))
+        a = self.arrays
+
+        if self.kind == "tree":
+            # sklearn compares float32 features with the thresholds
+            X = X.astype(np.float32)
+            rows = np.arange(len(X))
+            node = np.zeros(len(X), dtype=np.int32)
+            for _ in range(int(a["depth"])):
+                go_left = X[rows, a["feature"][node]] <= a["threshold"][node]
+                node = np.where(go_left, a["left"][node], a["right"][node])
+            return self.classes[a["node_class"][node]]
+
+        decision = X @ a["weights"].T + a["intercepts"]
+        if self.kind == "linear_ovo":
+            pairs = a["pairs"]
+            winners = np.where(decision > 0, pairs[:, 0], pairs[:, 1])
+            votes = np.zeros((len(X), len(self.classes)), dtype=np.int32)
+            np.add.at(votes, (np.repeat(np.arange(len(X)), len(pairs)), winners.ravel()), 1)
+            return self.classes[np.argmax(votes, axis=1)]
+        if decision.shape[1] == 1:
+            return self.classes[(decision[:, 0] > 0).astype(np.intp)]
+        return self.classes[np.argmax(decision, axis=1)]
+
+
+def load_model(path):
+    """
+    Load a model saved with utils.export_model.export_model.
+
+    Parameters:
+    - path (str): .npz file.
+
+    Returns:
+    FastPredictor
+    """
+    with np.load(path) as data:
+        return FastPredictor({name: data[name] for name in data.files})
+
+
+if __name__ == "__main__":
+    start = time.perf_counter()
+    model = load_model(sys.argv[1])
+    print(f"Loaded {model.kind} model in {(time.perf_counter() - start) * 1000:.2f} ms")
+
+    samples = np.random.default_rng(0).uniform(0, 15, (100000, model.features))
+    start = time.perf_counter()
+    model.predict(samples[:1])
+    print(f"Single sample: {(time.perf_counter() - start) * 1e6:.1f} us")
+    start = time.perf_counter()
+    model.predict(samples)
+    print(f"Batch: {len(samples) / (time.perf_counter() - start):.0f} samples/s")
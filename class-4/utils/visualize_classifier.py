@@ -1,25 +1,230 @@
 # CODE FROM NAI_04_DEMO  - NAI_04_DEMO/Decision_Tree/utilities.py
 
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
 import matplotlib.pyplot as plt
 
-def visualize_classifier(classifier, X, y, title=''):
+# Rough memory used by classifier.predict per mesh point: the float64 input row and the
+# temporary arrays of the prediction
+BYTES_PER_POINT = 64
+
+
+def predict_mesh(classifier, x_values, y_values, block_size=65536, workers=1, max_memory=None):
+    """
+    Evaluate the classifier on the mesh x_values x y_values block by block.
+
+    Only one block of input points per worker exists at a time, the mesh itself is never
+    materialized. The predicted classes are written to a preallocated int8 array.
+
+    Parameters:
+    - classifier: Fitted classifier with predict (and classes_).
+    - x_values (np.ndarray): X coordinates of the mesh columns.
+    - y_values (np.ndarray): Y coordinates of the mesh rows.
+    - block_size (int): Points predicted in one call.
+    - workers (int): Number of threads evaluating blocks.
+    - max_memory (int): Memory budget in bytes for the blocks in flight, lowers block_size if needed.
+
+    Returns:
+    tuple: (len(y_values) x len(x_values) int8 class indices, stats dict with points, blocks,
+    block_size, seconds and points_per_second)
+    """
+    if max_memory is not None:
+        block_size = max(1, min(block_size, max_memory // (BYTES_PER_POINT * workers)))
+
+    width = len(x_values)
+    output = np.empty((len(y_values), width), dtype=np.int8)
+    flat = output.reshape(-1)
+    classes = getattr(classifier, "classes_", None)
+
+    def predict_block(start):
+        index = np.arange(start, min(start + block_size, flat.size))
+        predicted = classifier.predict(np.column_stack((x_values[index % width], y_values[index // width])))
+        flat[start:start + len(index)] = np.searchsorted(classes, predicted) if classes is not None else predicted
+
+    starts = range(0, flat.size, block_size)
+    begin = time.perf_counter()
+    if workers > 1:
+        with ThreadPoolExecutor(workers) as pool:
+            list(pool.map(predict_block, starts))
+    else:
+        for start in starts:
+            predict_block(start)
+    seconds = time.perf_counter() - begin
+
+    stats = {
+        "points": flat.size,
+        "blocks": len(starts),
+        "block_size": block_size,
+        "seconds": seconds,
+        "points_per_second": flat.size / seconds if seconds else float("inf"),
+    }
+    return output, stats
+
+
+def _predict_points(classifier, x_values, y_values, rows, columns, block_size):
+    """Predict the class indices of some mesh points, block by block. Returns (indices, predict calls)."""
+    classes = getattr(classifier, "classes_", None)
+    result = np.empty(len(rows), dtype=np.int8)
+    calls = 0
+    for start in range(0, len(rows), block_size):
+        end = start + block_size
+        predicted = classifier.predict(np.column_stack((x_values[columns[start:end]], y_values[rows[start:end]])))
+        result[start:end] = np.searchsorted(classes, predicted) if classes is not None else predicted
+        calls += 1
+    return result, calls
+
+
+def _split_thresholds(classifier):
+    """
+    Thresholds of the axis-aligned splits of a tree model (or of a forest of them).
+
+    Returns:
+    tuple: (sorted thresholds of feature 0, sorted thresholds of feature 1), None for other models.
+    """
+    trees = [classifier] if hasattr(classifier, "tree_") else list(np.ravel(getattr(classifier, "estimators_", [])))
+    if not trees or not all(hasattr(tree, "tree_") for tree in trees):
+        return None
+    features = np.concatenate([tree.tree_.feature for tree in trees])
+    thresholds = np.concatenate([tree.tree_.threshold for tree in trees])
+    return tuple(np.unique(thresholds[features == feature]) for feature in (0, 1))
+
+
+def predict_mesh_adaptive(classifier, x_values, y_values, coarse_step=8, block_size=65536):
+    """
+    Evaluate the classifier on the mesh x_values x y_values by refining only around the decision boundary.
+
+    A coarse lattice of every coarse_step-th point is predicted first. Cells whose four corners
+    have the same class are filled with it, the other cells are split into four and their new
+    corners are predicted, until the cells are one point wide.
+
+    For tree models (a DecisionTree or a forest of them) a cell crossed by a split threshold is
+    split too, even if its corners agree, so the result is exactly the one of predict_mesh. For
+    other models the result is approximate: it differs from predict_mesh when a region of
+    another class fits inside a cell without touching its corners.
+
+    Parameters:
+    - classifier: Fitted classifier with predict (and classes_).
+    - x_values (np.ndarray): X coordinates of the mesh columns.
+    - y_values (np.ndarray): Y coordinates of the mesh rows.
+    - coarse_step (int): Distance between the points of the first lattice.
+    - block_size (int): Points predicted in one call.
+
+    Returns:
+    tuple: (len(y_values) x len(x_values) int8 class indices, stats dict with points,
+    predicted_points (the uniform mesh predicts all points), predict_calls, seconds and points_per_second)
+    """
+    height, width = len(y_values), len(x_values)
+    output = np.zeros((height, width), dtype=np.int8)
+    known = np.zeros((height, width), dtype=bool)
+    predicted_points = calls = 0
+
+    lattice_rows = np.unique(np.r_[np.arange(0, height, coarse_step), height - 1])
+    lattice_columns = np.unique(np.r_[np.arange(0, width, coarse_step), width - 1])
+    # A mesh one point wide or high has cells with the same first and last row (column)
+    row_ends = lattice_rows[1:] if len(lattice_rows) > 1 else lattice_rows
+    column_ends = lattice_columns[1:] if len(lattice_columns) > 1 else lattice_columns
+    r0, c0 = np.meshgrid(lattice_rows[:len(row_ends)], lattice_columns[:len(column_ends)], indexing="ij")
+    r1, c1 = np.meshgrid(row_ends, column_ends, indexing="ij")
+    r0, c0, r1, c1 = r0.ravel(), c0.ravel(), r1.ravel(), c1.ravel()
+    splits = _split_thresholds(classifier)
+
+    begin = time.perf_counter()
+    while len(r0):
+        # Predict the corners that are not known yet (neighbouring cells share corners)
+        rows, columns = np.concatenate([r0, r0, r1, r1]), np.concatenate([c0, c1, c0, c1])
+        flat = np.unique(rows * width + columns)
+        flat = flat[~known.reshape(-1)[flat]]
+        if len(flat):
+            values, block_calls = _predict_points(classifier, x_values, y_values, flat // width, flat % width, block_size)
+            output.reshape(-1)[flat], known.reshape(-1)[flat] = values, True
+            predicted_points += len(flat)
+            calls += block_calls
+
+        corners = np.stack([output[r0, c0], output[r0, c1], output[r1, c0], output[r1, c1]])
+        uniform = (corners == corners[0]).all(axis=0)
+        if splits is not None:
+            # A point goes left of a split if its value <= threshold, the cell is split by every
+            # threshold in [first, last) of its coordinates
+            for thresholds, start, end in ((splits[0], x_values[c0], x_values[c1]), (splits[1], y_values[r0], y_values[r1])):
+                uniform &= np.searchsorted(thresholds, end) == np.searchsorted(thresholds, start)
+        for index in np.flatnonzero(uniform):
+            cell = (slice(r0[index], r1[index] + 1), slice(c0[index], c1[index] + 1))
+            output[cell] = np.where(known[cell], output[cell], corners[0, index])
+
+        # Split the other cells, cells of at most 2 x 2 points have all their points as corners
+        split_rows, split_columns = r1 - r0 > 1, c1 - c0 > 1
+        refine = ~uniform & (split_rows | split_columns)
+        r0, c0, r1, c1 = r0[refine], c0[refine], r1[refine], c1[refine]
+        split_rows, split_columns = split_rows[refine], split_columns[refine]
+        middle_row, middle_column = (r0 + r1) // 2, (c0 + c1) // 2
+        row_parts = [(np.ones_like(split_rows), r0, np.where(split_rows, middle_row, r1)), (split_rows, middle_row, r1)]
+        column_parts = [(np.ones_like(split_columns), c0, np.where(split_columns, middle_column, c1)), (split_columns, middle_column, c1)]
+        children = [
+            (row_start[row_keep & column_keep], column_start[row_keep & column_keep], row_end[row_keep & column_keep], column_end[row_keep & column_keep])
+            for row_keep, row_start, row_end in row_parts
+            for column_keep, column_start, column_end in column_parts
+        ]
+        r0, c0, r1, c1 = (np.concatenate(part) for part in zip(*children))
+    seconds = time.perf_counter() - begin
+
+    stats = {
+        "points": height * width,
+        "predicted_points": predicted_points,
+        "predict_calls": calls,
+        "seconds": seconds,
+        "points_per_second": height * width / seconds if seconds else float("inf"),
+    }
+    return output, stats
+
+
+def visualize_classifier(classifier, X, y, title='', tiled=False, adaptive=False, block_size=65536, workers=1, max_memory=None):
+    """
+    Plot the decision regions of a classifier on the first two features with the points.
+
+    Parameters:
+    - classifier: Fitted classifier with predict.
+    - X (np.ndarray): Points, the first two columns are plotted.
+    - y (np.ndarray): Classes of the points.
+    - title (str): Title of the plot.
+    - tiled (bool): Evaluate the mesh block by block, see predict_mesh.
+    - adaptive (bool): Predict only around the decision boundary, see predict_mesh_adaptive.
+      The image is exact for tree models and approximate for other models (small regions
+      inside a coarse cell may be missing).
+    - block_size (int): Points predicted in one call.
+    - workers (int): Number of threads of the tiled mesh.
+    - max_memory (int): Memory budget in bytes of the tiled mesh.
+    """
     # Define the minimum and maximum values for X and Y
     # that will be used in the mesh grid
     min_x, max_x = X[:, 0].min() - 1.0, X[:, 0].max() + 1.0
     min_y, max_y = X[:, 1].min() - 1.0, X[:, 1].max() + 1.0
 
-    # Define the step size to use in plotting the mesh grid 
+    # Define the step size to use in plotting the mesh grid
     mesh_step_size = 0.01
 
-    # Define the mesh grid of X and Y values
-    x_vals, y_vals = np.meshgrid(np.arange(min_x, max_x, mesh_step_size), np.arange(min_y, max_y, mesh_step_size))
+    if adaptive:
+        # Predict only around the decision boundary, see predict_mesh_adaptive
+        x_vals, y_vals = np.arange(min_x, max_x, mesh_step_size), np.arange(min_y, max_y, mesh_step_size)
+        output, stats = predict_mesh_adaptive(classifier, x_vals, y_vals, block_size=block_size)
+        print(f"{stats['predicted_points']} of {stats['points']} points predicted "
+              f"({stats['predicted_points'] / stats['points']:.1%}) in {stats['predict_calls']} predict calls")
+    elif tiled:
+        # Evaluate the mesh in blocks, see predict_mesh
+        x_vals, y_vals = np.arange(min_x, max_x, mesh_step_size), np.arange(min_y, max_y, mesh_step_size)
+        output, stats = predict_mesh(classifier, x_vals, y_vals, block_size, workers, max_memory)
+        print(f"{stats['points']} points in {stats['blocks']} blocks of {stats['block_size']}: "
+              f"{stats['points_per_second']:.0f} points/s")
+    else:
+        # Define the mesh grid of X and Y values
+        x_vals, y_vals = np.meshgrid(np.arange(min_x, max_x, mesh_step_size), np.arange(min_y, max_y, mesh_step_size))
 
-    # Run the classifier on the mesh grid
-    output = classifier.predict(np.c_[x_vals.ravel(), y_vals.ravel()])
+        # Run the classifier on the mesh grid
+        output = classifier.predict(np.c_[x_vals.ravel(), y_vals.ravel()])
 
-    # Reshape the output array
-    output = output.reshape(x_vals.shape)
+        # Reshape the output array
+        output = output.reshape(x_vals.shape)
 
     # Create a plot
     plt.figure()
@@ -27,10 +232,10 @@ def visualize_classifier(classifier, X, y, title=''):
     # Specify the title
     plt.title(title)
 
-    # Choose a color scheme for the plot 
+    # Choose a color scheme for the plot
     plt.pcolormesh(x_vals, y_vals, output, cmap=plt.cm.gray)
 
-    # Overlay the training points on the plot 
+    # Overlay the training points on the plot
     plt.scatter(X[:, 0], X[:, 1], c=y, s=75, edgecolors='black', linewidth=1, cmap=plt.cm.Paired)
 
     # Specify the boundaries of the plot
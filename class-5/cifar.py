@@ -6,7 +6,6 @@ dependencies:
     pip install matplotlib
     pip install numpy
 """
-from tensorflow.keras.datasets import cifar10
 from tensorflow.keras.models import Sequential
 from tensorflow.keras.layers import Conv2D, MaxPooling2D, Flatten, Dense, Dropout
 from tensorflow.keras.utils import to_categorical
@@ -16,17 +15,21 @@ import seaborn as sns
 from matplotlib import pyplot as plt
 from tensorflow.python.ops.confusion_matrix import confusion_matrix
 
-(X_train, y_train), (X_test, y_test) = cifar10.load_data()
+from dataset_cache import load_dataset
+from pipeline import ExamplesPerSecond, make_dataset
 
-# Normalize the data
-X_train = X_train / 255
-X_test = X_test / 255
+# memory-mapped copy of cifar10.load_data(), converted on the first run
+(X_train, y_train), (X_test, y_test) = load_dataset("cifar10")
 
 # encode labels
 
 y_train = to_categorical(y_train, 10)
 y_test = to_categorical(y_test, 10)
 
+# uint8 images, normalized per batch in the pipeline
+train_data = make_dataset(X_train, y_train, batch_size=32, training=True)
+test_data = make_dataset(X_test, y_test, batch_size=32, training=False)
+
 # Build the model
 model = Sequential()
 model.add(Conv2D(32, (3, 3), activation="relu", input_shape=(32, 32, 3)))
@@ -57,16 +60,16 @@ model.compile(loss="categorical_crossentropy", optimizer="adam", metrics=["accur
 model2.compile(loss="categorical_crossentropy", optimizer="adam", metrics=["accuracy"])
 
 # Train the model
-model.fit(X_train, y_train, batch_size=32, epochs=10, validation_data=(X_test, y_test))
-model2.fit(X_train, y_train, batch_size=32, epochs=10, validation_data=(X_test, y_test))
+model.fit(train_data, epochs=10, validation_data=test_data, callbacks=[ExamplesPerSecond(len(X_train))])
+model2.fit(train_data, epochs=10, validation_data=test_data, callbacks=[ExamplesPerSecond(len(X_train))])
 
-# Evaluate the model
-model.evaluate(X_test, y_test)
-model2.evaluate(X_test, y_test)
+# Evaluate the models, once each
+loss, accuracy = model.evaluate(test_data)
+loss2, accuracy2 = model2.evaluate(test_data)
 
 
 # create confusion matrix
-predictions = model.predict(X_test)
+predictions = model.predict(test_data)
 predicted_labels = np.argmax(predictions, axis=1)
 
 y_test_labels = np.argmax(y_test, axis=1)
@@ -80,13 +83,12 @@ plt.ylabel('Test')
 plt.title('conf_matrix')
 plt.show()
 
-loss, accuracy = model.evaluate(X_test, y_test)
-
 print(f"Loss model 1: {loss}")
-print(f"Accuracy model 2: {accuracy}")
-
-loss2, accuracy2 = model2.evaluate(X_test, y_test)
+print(f"Accuracy model 1: {accuracy}")
 
 print(f"Loss model 2: {loss2}")
 print(f"Accuracy model 2: {accuracy2}")
 
+# save the models for serve.py
+model.save("cifar_model.keras")
+model2.save("cifar_model2.keras")
@@ -0,0 +1,115 @@
+"""
+Authors: Mateusz Budzyński, Igor Gutowski
+
+On-disk cache of the Keras datasets as memory-mapped .npy files.
+
+cifar10.load_data() and fashion_mnist.load_data() decompress and unpickle the archives on every
+run. The first call of load_dataset converts the dataset once into four .npy files
+(x_train, y_train, x_test, y_test) and a manifest.json with their shapes and dtypes. Later calls
+open them with np.load(mmap_mode="r"): nothing is read until it is used, and several training
+processes share the same pages of the OS page cache.
+
+dependencies:
+    pip install tensorflow
+
+Usage:
+    python dataset_cache.py cifar10 fashion_mnist
+"""
+
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+CACHE_DIR = "dataset_cache"
+ARRAYS = ("x_train", "y_train", "x_test", "y_test")
+
+
+def _keras_loader(name):
+    """Return the load_data function of a Keras dataset."""
+    from tensorflow.keras import datasets
+
+    if not hasattr(datasets, name):
+        raise ValueError(f"Unknown dataset {name}")
+    return getattr(datasets, name).load_data
+
+
+def convert(name, cache_dir=CACHE_DIR):
+    """
+    Convert a Keras dataset into .npy files and a manifest.
+
+    Parameters:
+    - name (str): Module name in tensorflow.keras.datasets, e.g. cifar10 or fashion_mnist.
+    - cache_dir (str): Root directory of the cache.
+
+    Returns:
+    dict: The manifest.
+    """
+    directory = os.path.join(cache_dir, name)
+    os.makedirs(directory, exist_ok=True)
+
+    start = time.perf_counter()
+    (x_train, y_train), (x_test, y_test) = _keras_loader(name)()
+    arrays = dict(zip(ARRAYS, (x_train, y_train, x_test, y_test)))
+    for array_name, array in arrays.items():
+        np.save(os.path.join(directory, array_name + ".npy"), np.ascontiguousarray(array))
+
+    manifest = {
+        "name": name,
+        "arrays": {
+            array_name: {"shape": list(array.shape), "dtype": array.dtype.str, "bytes": array.nbytes}
+            for array_name, array in arrays.items()
+        },
+        "convert_seconds": time.perf_counter() - start,
+    }
+    # The manifest is written last, a cache without it is converted again
+    with open(os.path.join(directory, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def load_dataset(name, cache_dir=CACHE_DIR):
+    """
+    Open a cached dataset, converting it first if needed.
+
+    Parameters:
+    - name (str): Module name in tensorflow.keras.datasets, e.g. cifar10 or fashion_mnist.
+    - cache_dir (str): Root directory of the cache.
+
+    Returns:
+    tuple: ((x_train, y_train), (x_test, y_test)) read-only memory-mapped arrays, like load_data.
+    """
+    directory = os.path.join(cache_dir, name)
+    manifest_path = os.path.join(directory, "manifest.json")
+    if not os.path.exists(manifest_path):
+        convert(name, cache_dir)
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+
+    arrays = []
+    for array_name in ARRAYS:
+        array = np.load(os.path.join(directory, array_name + ".npy"), mmap_mode="r")
+        expected = manifest["arrays"][array_name]
+        if list(array.shape) != expected["shape"] or array.dtype.str != expected["dtype"]:
+            raise ValueError(f"{array_name} in {directory} doesn't match the manifest, remove the directory to convert it again")
+        arrays.append(array)
+    return (arrays[0], arrays[1]), (arrays[2], arrays[3])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert Keras datasets into memory-mapped .npy files.")
+    parser.add_argument("names", nargs="+", help="e.g. cifar10 fashion_mnist")
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    args = parser.parse_args()
+
+    for name in args.names:
+        for run in ("first", "cached"):
+            start = time.perf_counter()
+            (x_train, _), (x_test, _) = load_dataset(name, args.cache_dir)
+            print(f"{name} {run} load: {len(x_train)} + {len(x_test)} images in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+"""
+Authors: Mateusz Budzyński, Igor Gutowski
+
+Parallel training and comparison of several CNN architectures on CIFAR-10 (or Fashion-MNIST).
+
+cifar.py trains its two models one after the other. This runner takes a list of architecture
+specs and trains them at the same time in separate processes:
+    - the images and labels are copied once into shared memory (multiprocessing.shared_memory)
+      and every process reads them without a copy,
+    - every process gets cpu_count / workers threads for TensorFlow, so the processes don't
+      oversubscribe the cores,
+    - every model is evaluated with one predict pass over the test set, the loss, accuracy and
+      confusion matrix are all computed from these predictions.
+
+The results are saved to one JSON report.
+
+A spec is a dict: {"name": ..., "conv": [filters of every Conv2D + MaxPooling2D block],
+"dense": units of the hidden Dense layer, "dropout": dropout rate}.
+
+dependencies:
+    pip install tensorflow
+
+Usage:
+    python experiments.py --dataset cifar10 --epochs 10 --workers 2 --output cifar_experiments.json
+    python experiments.py --specs specs.json
+"""
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import get_context, shared_memory
+
+import numpy as np
+
+from dataset_cache import load_dataset
+
+# The two models of cifar.py
+CIFAR_SPECS = [
+    {"name": "model_1", "conv": [32, 64], "dense": 128, "dropout": 0.5},
+    {"name": "model_2", "conv": [32, 64, 128], "dense": 128, "dropout": 0.5},
+]
+CLASSES = 10
+
+arrays = {}  # Arrays of the current worker, attached to shared memory by init_worker
+attached = []  # SharedMemory objects of the worker, kept open while it runs
+
+
+def share_arrays(named_arrays):
+    """
+    Copy arrays into new shared memory blocks.
+
+    Parameters:
+    - named_arrays (dict): name -> np.ndarray
+
+    Returns:
+    tuple: (list of SharedMemory blocks, dict name -> (block name, shape, dtype) for init_worker)
+    """
+    blocks, specs = [], {}
+    for name, array in named_arrays.items():
+        block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        np.ndarray(array.shape, array.dtype, buffer=block.buf)[...] = array
+        blocks.append(block)
+        specs[name] = (block.name, array.shape, array.dtype.str)
+    return blocks, specs
+
+
+def init_worker(specs, threads):
+    """
+    Limit the threads of the worker and attach it to the shared data.
+
+    Parameters:
+    - specs (dict): Shared arrays, see share_arrays.
+    - threads (int): Threads TensorFlow may use in this process.
+    """
+    # Must be set before TensorFlow is imported
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    os.environ["TF_NUM_INTRAOP_THREADS"] = str(threads)
+    os.environ["TF_NUM_INTEROP_THREADS"] = "1"
+    os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "2")
+    import tensorflow as tf
+
+    tf.config.threading.set_intra_op_parallelism_threads(threads)
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+
+    for name, (block_name, shape, dtype) in specs.items():
+        block = shared_memory.SharedMemory(name=block_name)
+        attached.append(block)
+        arrays[name] = np.ndarray(shape, np.dtype(dtype), buffer=block.buf)
+
+
+def build_model(spec, input_shape, classes=CLASSES):
+    """
+    Build and compile the model of a spec.
+
+    Parameters:
+    - spec (dict): Architecture spec.
+    - input_shape (tuple): Shape of one image.
+    - classes (int): Number of classes.
+
+    Returns:
+    tf.keras.Model
+    """
+    from tensorflow.keras import Input
+    from tensorflow.keras.models import Sequential
+    from tensorflow.keras.layers import Conv2D, MaxPooling2D, Flatten, Dense, Dropout
+
+    model = Sequential()
+    model.add(Input(shape=input_shape))
+    for filters in spec["conv"]:
+        model.add(Conv2D(filters, (3, 3), activation="relu"))
+        model.add(MaxPooling2D())
+    model.add(Flatten())
+    model.add(Dense(spec["dense"], activation="relu"))
+    model.add(Dropout(spec["dropout"]))
+    model.add(Dense(classes, activation="softmax"))
+    model.compile(loss="sparse_categorical_crossentropy", optimizer="adam", metrics=["accuracy"])
+    return model
+
+
+def train_spec(spec, epochs, batch_size, seed):
+    """
+    Train and evaluate one spec on the shared data.
+
+    Parameters:
+    - spec (dict): Architecture spec.
+    - epochs (int): Training epochs.
+    - batch_size (int): Batch size.
+    - seed (int): Seed of the weights and of the shuffling.
+
+    Returns:
+    dict: Results of the spec.
+    """
+    import tensorflow as tf
+    from pipeline import ExamplesPerSecond, make_dataset
+
+    tf.keras.utils.set_random_seed(seed)
+    x_train, y_train, x_test, y_test = (arrays[name] for name in ("x_train", "y_train", "x_test", "y_test"))
+    # Channel axis for grayscale images
+    if x_train.ndim == 3:
+        x_train, x_test = x_train[..., np.newaxis], x_test[..., np.newaxis]
+
+    model = build_model(spec, x_train.shape[1:])
+    throughput = ExamplesPerSecond(len(x_train))
+    start = time.perf_counter()
+    model.fit(
+        make_dataset(x_train, y_train, batch_size, training=True, seed=seed, gather=True),
+        epochs=epochs,
+        verbose=0,
+        callbacks=[throughput],
+    )
+    fit_seconds = time.perf_counter() - start
+
+    # One predict pass, everything else is computed from the probabilities
+    start = time.perf_counter()
+    probabilities = model.predict(make_dataset(x_test, y_test, batch_size=256, training=False, gather=True), verbose=0)
+    predict_seconds = time.perf_counter() - start
+    predicted = np.argmax(probabilities, axis=1)
+    confusion = np.zeros((CLASSES, CLASSES), dtype=np.int64)
+    np.add.at(confusion, (y_test, predicted), 1)
+
+    return {
+        "name": spec["name"],
+        "spec": spec,
+        "parameters": model.count_params(),
+        "fit_seconds": fit_seconds,
+        "train_examples_per_second": throughput.history,
+        "predict_seconds": predict_seconds,
+        "loss": float(-np.mean(np.log(np.clip(probabilities[np.arange(len(y_test)), y_test], 1e-7, 1)))),
+        "accuracy": float(np.mean(predicted == y_test)),
+        "confusion_matrix": confusion.tolist(),
+    }
+
+
+def run_experiments(specs, dataset="cifar10", epochs=10, batch_size=32, workers=None, seed=0):
+    """
+    Train all specs in parallel processes.
+
+    Parameters:
+    - specs (list): Architecture specs.
+    - dataset (str): Dataset name, see dataset_cache.load_dataset.
+    - epochs (int): Training epochs.
+    - batch_size (int): Batch size.
+    - workers (int): Number of processes (None - one per spec, at most one per CPU).
+    - seed (int): Seed of every model.
+
+    Returns:
+    dict: The report.
+    """
+    (x_train, y_train), (x_test, y_test) = load_dataset(dataset)
+    data = {
+        "x_train": x_train,
+        "y_train": np.asarray(y_train).reshape(-1).astype(np.int64),
+        "x_test": x_test,
+        "y_test": np.asarray(y_test).reshape(-1).astype(np.int64),
+    }
+    workers = workers or min(len(specs), os.cpu_count())
+    threads = max(1, os.cpu_count() // workers)
+
+    start = time.perf_counter()
+    blocks, shared = share_arrays(data)
+    try:
+        # spawn - TensorFlow doesn't work in forked processes
+        with ProcessPoolExecutor(workers, mp_context=get_context("spawn"), initializer=init_worker, initargs=(shared, threads)) as pool:
+            futures = [pool.submit(train_spec, spec, epochs, batch_size, seed) for spec in specs]
+            results = []
+            for future in as_completed(futures):
+                result = future.result()
+                print(f"{result['name']}: accuracy {result['accuracy']:.4f}, loss {result['loss']:.4f}, "
+                      f"fit {result['fit_seconds']:.1f} s")
+                results.append(result)
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+    order = {spec["name"]: index for index, spec in enumerate(specs)}
+    return {
+        "dataset": dataset,
+        "epochs": epochs,
+        "batch_size": batch_size,
+        "workers": workers,
+        "threads_per_worker": threads,
+        "seconds": time.perf_counter() - start,
+        "results": sorted(results, key=lambda result: order[result["name"]]),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train several architectures in parallel and compare them.")
+    parser.add_argument("--dataset", default="cifar10", help="cifar10 or fashion_mnist")
+    parser.add_argument("--specs", help="JSON file with a list of specs (default: the models of cifar.py)")
+    parser.add_argument("--epochs", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="experiments.json")
+    args = parser.parse_args()
+
+    specs = CIFAR_SPECS
+    if args.specs:
+        with open(args.specs) as f:
+            specs = json.load(f)
+
+    report = run_experiments(specs, args.dataset, args.epochs, args.batch_size, args.workers, args.seed)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"{len(specs)} models in {report['seconds']:.1f} s on {report['workers']} processes "
+          f"x {report['threads_per_worker']} threads")
+    for result in report["results"]:
+        print(f"{result['name']:>12}: accuracy {result['accuracy']:.4f}, loss {result['loss']:.4f}, "
+              f"{result['parameters']} parameters, fit {result['fit_seconds']:.1f} s, "
+              f"predict {result['predict_seconds']:.2f} s")
+    print(f"Report saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
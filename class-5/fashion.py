@@ -5,16 +5,18 @@ dependencies:
     pip install tensorflow
 """
 
-from tensorflow.keras.datasets import fashion_mnist
 from tensorflow.keras.models import Sequential
 from tensorflow.keras.layers import Flatten, Dense, Dropout
 
+from dataset_cache import load_dataset
+from pipeline import ExamplesPerSecond, make_dataset
 
-(X_train, y_train), (X_test, y_test) = fashion_mnist.load_data()
+# memory-mapped copy of fashion_mnist.load_data(), converted on the first run
+(X_train, y_train), (X_test, y_test) = load_dataset("fashion_mnist")
 
-# normalize data
-X_train = X_train / 255
-X_test = X_test / 255
+# uint8 images, normalized per batch in the pipeline
+train_data = make_dataset(X_train, y_train, batch_size=128, training=True)
+test_data = make_dataset(X_test, y_test, batch_size=128, training=False)
 
 # Build the model
 model = Sequential()
@@ -29,9 +31,12 @@ model.compile(
 )
 
 # Train the model
-model.fit(X_train, y_train, epochs=10, batch_size=128, validation_data=(X_test, y_test))
+model.fit(train_data, epochs=10, validation_data=test_data, callbacks=[ExamplesPerSecond(len(X_train))])
 
 # Evaluate the model
-loss, accuracy = model.evaluate(X_test, y_test, verbose=0)
+loss, accuracy = model.evaluate(test_data, verbose=0)
 print("Loss:", loss)
 print("Accuracy:", accuracy)
+
+# save the model for serve.py
+model.save("fashion_model.keras")
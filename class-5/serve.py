@@ -0,0 +1,279 @@
+"""
+Authors: Mateusz Budzyński, Igor Gutowski
+
+Local inference server for the models saved by cifar.py, fashion.py and wine.py.
+
+A single-sample model.predict spends most of its time on per-call overhead. The server loads the
+model once, calls it directly (without the per-call setup of model.predict) and puts every
+request into a queue. A worker thread collects the waiting requests
+into one batch (at most max_batch samples, waiting at most max_wait_ms for more after the first
+one), runs one batched forward pass and returns the rows to the requests.
+
+Endpoints:
+    POST /predict  {"inputs": one sample as nested lists} -> {"class": ..., "probabilities": [...]}
+    GET  /stats    latency percentiles of the latest requests and the histogram of batch sizes
+
+dependencies:
+    pip install tensorflow
+
+Usage:
+    python serve.py cifar_model.keras --normalize --port 8000
+    python serve.py fashion_model.keras --normalize --benchmark 2000
+"""
+
+import argparse
+import json
+import os
+import queue
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+LATENCY_WINDOW = 10000  # Number of the latest requests the latency percentiles are computed from
+
+
+class MicroBatcher:
+    """
+    Dynamic micro-batching of single-sample predictions.
+
+    Attributes:
+    - max_batch (int): Largest batch passed to predict_batch.
+    - max_wait (float): Longest time in seconds the first request of a batch waits for others.
+    - latencies (deque): Seconds from submit to result of the latest latency_window requests.
+    - requests (int): Number of all answered requests.
+    - batch_sizes (Counter): Number of batches of every size.
+    """
+
+    def __init__(self, predict_batch, max_batch=32, max_wait_ms=5.0, latency_window=LATENCY_WINDOW):
+        """
+        Start the worker thread.
+
+        Parameters:
+        - predict_batch (callable): Function of a batch (np.ndarray) returning one row per sample.
+        - max_batch (int): Largest batch.
+        - max_wait_ms (float): Batching window in milliseconds.
+        - latency_window (int): Number of the latest latencies kept for the percentiles.
+        """
+        self.predict_batch = predict_batch
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.latencies = deque(maxlen=latency_window)
+        self.requests = 0
+        self.batch_sizes = Counter()
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+    def submit(self, sample):
+        """
+        Queue one sample.
+
+        Parameters:
+        - sample (np.ndarray): One input sample (without the batch axis).
+
+        Returns:
+        Future: Resolves to the model output of the sample.
+        """
+        future = Future()
+        self._queue.put((np.asarray(sample), future, time.perf_counter()))
+        return future
+
+    def predict(self, sample):
+        """Predict one sample, waiting for the result."""
+        return self.submit(sample).result()
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            requests = [first]
+            deadline = time.perf_counter() + self.max_wait
+            while len(requests) < self.max_batch:
+                timeout = deadline - time.perf_counter()
+                if timeout <= 0:
+                    break
+                try:
+                    request = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if request is None:
+                    self._queue.put(None)  # Stop after this batch
+                    break
+                requests.append(request)
+
+            try:
+                outputs = self.predict_batch(np.stack([sample for sample, _, _ in requests]))
+            except Exception as error:
+                for _, future, _ in requests:
+                    future.set_exception(error)
+                continue
+            done = time.perf_counter()
+            for (_, future, submitted), output in zip(requests, outputs):
+                future.set_result(output)
+            with self._lock:
+                self.latencies.extend(done - submitted for _, _, submitted in requests)
+                self.requests += len(requests)
+                self.batch_sizes[len(requests)] += 1
+
+    def stats(self):
+        """
+        Returns:
+        dict: Number of requests and batches, latency percentiles in ms (of the latest requests),
+        batch size histogram.
+        """
+        with self._lock:
+            latencies = np.array(self.latencies) * 1000
+            requests = self.requests
+            batch_sizes = dict(sorted(self.batch_sizes.items()))
+        if requests == 0:
+            return {"requests": 0, "batches": 0, "batch_sizes": {}}
+        return {
+            "requests": requests,
+            "batches": sum(batch_sizes.values()),
+            "mean_batch_size": requests / sum(batch_sizes.values()),
+            "latency_window": len(latencies),
+            "latency_ms": {f"p{p}": float(np.percentile(latencies, p)) for p in (50, 90, 99)},
+            "batch_sizes": batch_sizes,
+        }
+
+    def close(self):
+        """Stop the worker thread after the queued requests."""
+        self._queue.put(None)
+        self._worker.join()
+
+
+def load_predictor(path, normalize=False):
+    """
+    Load a saved Keras model as a batch predict function.
+
+    Parameters:
+    - path (str): .keras file saved by cifar.py, fashion.py or wine.py.
+    - normalize (bool): Divide the inputs by 255 (the image models are trained on X / 255).
+
+    Returns:
+    tuple: (predict_batch function, input shape of one sample)
+    """
+    os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "2")
+    import tensorflow as tf
+
+    model = tf.keras.models.load_model(path, compile=False)
+    scale = 1 / 255 if normalize else 1.0
+
+    def predict_batch(batch):
+        return model(tf.constant(batch.astype(np.float32) * scale), training=False).numpy()
+
+    input_shape = tuple(model.inputs[0].shape[1:])
+    predict_batch(np.zeros((1,) + input_shape, dtype=np.float32))  # Warm up
+    return predict_batch, input_shape
+
+
+def make_handler(batcher, input_shape):
+    """Create the HTTP request handler class of a batcher."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def _reply(self, status, body):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path == "/stats":
+                self._reply(200, batcher.stats())
+            else:
+                self._reply(404, {"error": "not found"})
+
+        def do_POST(self):
+            if self.path != "/predict":
+                self._reply(404, {"error": "not found"})
+                return
+            try:
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                sample = np.array(request["inputs"], dtype=np.float32)
+                # A wrong shape would fail the whole batch it is put in
+                if sample.shape != input_shape:
+                    raise ValueError(f"Expected inputs of shape {input_shape}, got {sample.shape}")
+                probabilities = batcher.predict(sample)
+            except Exception as error:
+                self._reply(400, {"error": str(error)})
+                return
+            self._reply(200, {"class": int(np.argmax(probabilities)), "probabilities": probabilities.tolist()})
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def benchmark(batcher, predict_batch, input_shape, requests=1000, clients=32):
+    """
+    Compare concurrent requests through the batcher with one predict call per sample.
+
+    Parameters:
+    - batcher (MicroBatcher): Batcher to measure.
+    - predict_batch (callable): The model, for the unbatched baseline.
+    - input_shape (tuple): Shape of one sample.
+    - requests (int): Number of requests.
+    - clients (int): Number of concurrent client threads.
+    """
+    samples = np.random.default_rng(0).integers(0, 256, (requests,) + input_shape).astype(np.float32)
+
+    start = time.perf_counter()
+    for sample in samples[:min(requests, 200)]:
+        predict_batch(sample[np.newaxis])
+    single = (time.perf_counter() - start) / min(requests, 200)
+    print(f"One predict per sample: {single * 1000:.2f} ms/request, {1 / single:.0f} requests/s")
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(clients) as pool:
+        list(pool.map(batcher.predict, samples))
+    elapsed = time.perf_counter() - start
+    stats = batcher.stats()
+    print(f"Micro-batched ({clients} clients): {requests / elapsed:.0f} requests/s, "
+          f"latency p50 {stats['latency_ms']['p50']:.2f} ms, p99 {stats['latency_ms']['p99']:.2f} ms, "
+          f"mean batch {stats['mean_batch_size']:.1f}")
+    print(f"Batch sizes: {stats['batch_sizes']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a saved Keras model with dynamic micro-batching.")
+    parser.add_argument("model", help=".keras file")
+    parser.add_argument("--normalize", action="store_true", help="Divide inputs by 255 (cifar and fashion models)")
+    parser.add_argument("--max-batch", type=int, default=32)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--benchmark", type=int, metavar="REQUESTS", help="Measure REQUESTS concurrent requests instead of serving")
+    parser.add_argument("--clients", type=int, default=32, help="Concurrent clients of the benchmark")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    predict_batch, input_shape = load_predictor(args.model, args.normalize)
+    print(f"Loaded {args.model} (input {input_shape}) in {time.perf_counter() - start:.2f} s")
+    batcher = MicroBatcher(predict_batch, args.max_batch, args.max_wait_ms)
+
+    if args.benchmark:
+        benchmark(batcher, predict_batch, input_shape, args.benchmark, args.clients)
+        batcher.close()
+        return
+
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), make_handler(batcher, input_shape))
+    print(f"Serving on http://127.0.0.1:{args.port} (POST /predict, GET /stats)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        batcher.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+"""
+Authors: Mateusz Budzyński, Igor Gutowski
+
+TFLite export and CPU benchmark of the models saved by cifar.py and fashion.py.
+
+The saved Keras model is converted twice:
+    - float32 - the same weights and arithmetic in a TFLite flatbuffer,
+    - int8 - full integer post-training quantization. The ranges of the activations are
+      calibrated on a representative set of training images (a random sample of x_train).
+      Inputs and outputs are int8 too, the benchmark quantizes the images with the scale and
+      zero point of the input tensor.
+
+For the Keras model and both TFLite models the benchmark reports the file size, the latency of
+a single image (p50/p99), the throughput of batched inference and the accuracy on the test set
+(and its drop against the Keras model).
+
+dependencies:
+    pip install tensorflow
+    pip install ai-edge-litert  (optional, replaces the deprecated tf.lite.Interpreter)
+
+Usage:
+    python tflite_export.py cifar_model.keras --dataset cifar10
+    python tflite_export.py fashion_model.keras --dataset fashion_mnist --calibration 1000
+"""
+
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from dataset_cache import load_dataset
+
+os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "2")
+import tensorflow as tf
+
+try:
+    from ai_edge_litert.interpreter import Interpreter
+except ImportError:
+    Interpreter = tf.lite.Interpreter
+
+LATENCY_SAMPLES = 200
+BATCH_SIZE = 256
+
+
+def representative_dataset(x_train, samples=500, seed=0):
+    """
+    Calibration images for the int8 quantization.
+
+    Parameters:
+    - x_train (np.ndarray): uint8 training images.
+    - samples (int): Number of images.
+    - seed (int): Seed of the sample.
+
+    Returns:
+    callable: Generator function yielding one normalized image at a time.
+    """
+    indices = np.random.default_rng(seed).choice(len(x_train), min(samples, len(x_train)), replace=False)
+
+    def generate():
+        for index in np.sort(indices):
+            yield [(x_train[index][np.newaxis] / 255).astype(np.float32)]
+
+    return generate
+
+
+def convert(model, x_train=None, calibration=500):
+    """
+    Convert a Keras model to TFLite.
+
+    Parameters:
+    - model (tf.keras.Model): Model trained on images / 255.
+    - x_train (np.ndarray): uint8 training images, None - float32 model without quantization.
+    - calibration (int): Number of calibration images of the int8 model.
+
+    Returns:
+    bytes: The TFLite flatbuffer.
+    """
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    if x_train is not None:
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.representative_dataset = representative_dataset(x_train, calibration)
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+        converter.inference_input_type = tf.int8
+        converter.inference_output_type = tf.int8
+    return converter.convert()
+
+
+class TFLiteModel:
+    """
+    TFLite interpreter with the predict interface of the benchmark.
+
+    Attributes:
+    - input (dict): Details of the input tensor.
+    - output (dict): Details of the output tensor.
+    """
+
+    def __init__(self, content):
+        self.interpreter = Interpreter(model_content=content)
+        self.interpreter.allocate_tensors()
+        self.input = self.interpreter.get_input_details()[0]
+        self.output = self.interpreter.get_output_details()[0]
+        self.batch = 1
+
+    def predict(self, images):
+        """
+        Predict the class scores of a batch of uint8 images.
+
+        Parameters:
+        - images (np.ndarray): uint8 images.
+
+        Returns:
+        np.ndarray: Scores (argmax is the class).
+        """
+        if len(images) != self.batch:
+            self.interpreter.resize_tensor_input(self.input["index"], (len(images),) + tuple(self.input["shape"][1:]))
+            self.interpreter.allocate_tensors()
+            self.input = self.interpreter.get_input_details()[0]
+            self.output = self.interpreter.get_output_details()[0]
+            self.batch = len(images)
+
+        data = images / 255
+        scale, zero_point = self.input["quantization"]
+        if self.input["dtype"] != np.float32:
+            info = np.iinfo(self.input["dtype"])
+            data = np.clip(np.round(data / scale + zero_point), info.min, info.max)
+        self.interpreter.set_tensor(self.input["index"], data.astype(self.input["dtype"]))
+        self.interpreter.invoke()
+        return self.interpreter.get_tensor(self.output["index"])
+
+
+class KerasModel:
+    """The original Keras model with the predict interface of the benchmark."""
+
+    def __init__(self, model):
+        self.model = model
+
+    def predict(self, images):
+        return self.model(tf.constant(images / 255, dtype=tf.float32), training=False).numpy()
+
+
+def measure(model, x_test, y_test, batch_size=BATCH_SIZE):
+    """
+    Measure single-image latency, batched throughput and accuracy.
+
+    Parameters:
+    - model: KerasModel or TFLiteModel.
+    - x_test (np.ndarray): uint8 test images.
+    - y_test (np.ndarray): Test labels.
+    - batch_size (int): Batch size of the throughput and accuracy pass.
+
+    Returns:
+    dict: latency_p50_ms, latency_p99_ms, throughput and accuracy.
+    """
+    latencies = np.empty(LATENCY_SAMPLES)
+    for index in range(LATENCY_SAMPLES):
+        image = x_test[index % len(x_test)][np.newaxis]
+        start = time.perf_counter()
+        model.predict(image)
+        latencies[index] = time.perf_counter() - start
+
+    predicted = np.empty(len(x_test), dtype=np.int64)
+    start = time.perf_counter()
+    for first in range(0, len(x_test), batch_size):
+        batch = np.asarray(x_test[first:first + batch_size])
+        if len(batch) < batch_size:
+            # Same batch size for every call, the padding is dropped
+            batch = np.concatenate([batch, np.zeros((batch_size - len(batch),) + batch.shape[1:], batch.dtype)])
+        predicted[first:first + batch_size] = np.argmax(model.predict(batch), axis=1)[:len(x_test) - first]
+    throughput = len(x_test) / (time.perf_counter() - start)
+
+    return {
+        "latency_p50_ms": float(np.percentile(latencies, 50) * 1000),
+        "latency_p99_ms": float(np.percentile(latencies, 99) * 1000),
+        "throughput": throughput,
+        "accuracy": float(np.mean(predicted == y_test)),
+    }
+
+
+def export_and_benchmark(model_path, dataset, calibration=500, limit=None):
+    """
+    Convert a saved model to float32 and int8 TFLite and benchmark all three.
+
+    Parameters:
+    - model_path (str): .keras file saved by cifar.py or fashion.py.
+    - dataset (str): Dataset of the model, see dataset_cache.load_dataset.
+    - calibration (int): Number of calibration images of the int8 model.
+    - limit (int): Use only the first test images (None - all).
+
+    Returns:
+    dict: The report, model name -> size and measurements.
+    """
+    (x_train, _), (x_test, y_test) = load_dataset(dataset)
+    x_test, y_test = x_test[:limit], np.asarray(y_test).reshape(-1)[:limit]
+    model = tf.keras.models.load_model(model_path, compile=False)
+
+    base = os.path.splitext(model_path)[0]
+    report = {"keras": {"path": model_path, "bytes": os.path.getsize(model_path), **measure(KerasModel(model), x_test, y_test)}}
+    for name, train_images in (("float32", None), ("int8", x_train)):
+        start = time.perf_counter()
+        content = convert(model, train_images, calibration)
+        path = f"{base}.{name}.tflite"
+        with open(path, "wb") as f:
+            f.write(content)
+        report[name] = {
+            "path": path,
+            "bytes": len(content),
+            "convert_seconds": time.perf_counter() - start,
+            **measure(TFLiteModel(content), x_test, y_test),
+        }
+    for name in ("float32", "int8"):
+        report[name]["accuracy_drop"] = report["keras"]["accuracy"] - report[name]["accuracy"]
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a saved Keras model to float32 and int8 TFLite and benchmark them.")
+    parser.add_argument("model", help=".keras file saved by cifar.py or fashion.py")
+    parser.add_argument("--dataset", default="cifar10", help="cifar10 or fashion_mnist")
+    parser.add_argument("--calibration", type=int, default=500, help="Number of calibration images")
+    parser.add_argument("--limit", type=int, default=None, help="Number of test images (default: all)")
+    parser.add_argument("--output", default=None, help="JSON report (default: <model>.tflite.json)")
+    args = parser.parse_args()
+
+    report = export_and_benchmark(args.model, args.dataset, args.calibration, args.limit)
+    output = args.output or os.path.splitext(args.model)[0] + ".tflite.json"
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    for name, row in report.items():
+        drop = f", drop {row['accuracy_drop'] * 100:+.2f} pp" if "accuracy_drop" in row else ""
+        print(f"{name:>8}: {row['bytes'] / 1024:.0f} KiB, p50 {row['latency_p50_ms']:.3f} ms, p99 {row['latency_p99_ms']:.3f} ms, "
+              f"{row['throughput']:.0f} images/s, accuracy {row['accuracy']:.4f}{drop}")
+    print(f"Report saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -39,4 +39,7 @@ model.fit(X_train, y_train, epochs=40, verbose=1, validation_data=(X_test, y_tes
 # Evaluate the model
 loss, accuracy = model.evaluate(X_test, y_test, verbose=0)
 print("Loss:", loss)
-print("Accuracy:", accuracy)
\ No newline at end of file
+print("Accuracy:", accuracy)
+
+# save the model for serve.py
+model.save("wine_model.keras")
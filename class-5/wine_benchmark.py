@@ -0,0 +1,229 @@
+"""
+Authors: Mateusz Budzyński, Igor Gutowski
+
+Benchmark of the wine classifiers: the decision tree (class-4/decision_tree_wine.py), the linear
+SVM (class-4/svm_wine.py) and the dense Keras network (wine.py).
+
+Every model is trained on repeated seeded train/test splits and on several feature subsets.
+The runs are independent and are executed in parallel with joblib. Every worker gets
+cpu_count / jobs threads for BLAS and TensorFlow (like experiments.py), so the timings of
+parallel runs don't include contention between the workers. For every run the report contains:
+    - fit_seconds - training time,
+    - latency_p50_ms, latency_p99_ms - time of predicting a single sample,
+    - throughput - samples per second when the whole test set is predicted at once,
+    - accuracy - on the test set.
+The summary groups the runs by model and feature subset (mean and standard deviation of the
+accuracy, medians of the timings).
+
+dependencies:
+    pip install sklearn
+    pip install tensorflow  (only for the keras_dense model)
+
+Usage:
+    python wine_benchmark.py --seeds 10 --jobs 4 --output wine_benchmark.json
+    python wine_benchmark.py --models decision_tree linear_svc
+"""
+
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn import datasets, svm
+from sklearn.metrics import accuracy_score
+from sklearn.model_selection import train_test_split
+from sklearn.tree import DecisionTreeClassifier
+from threadpoolctl import threadpool_limits
+
+FEATURE_SETS = {
+    "alcohol_malic_acid": [0, 1],  # The features used by the class-4 and class-5 scripts
+    "all": list(range(13)),
+}
+LATENCY_SAMPLES = 200  # Single-sample predictions timed per run
+THROUGHPUT_ROWS = 100000  # Rows predicted in batches per run
+
+
+class KerasDense:
+    """The network of wine.py behind the fit/predict interface of sklearn."""
+
+    def __init__(self, seed, epochs=40, threads=None):
+        self.seed = seed
+        self.epochs = epochs
+        self.threads = threads
+        self.model = None
+
+    def fit(self, X, y):
+        os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "2")
+        if self.threads:
+            # Must be set before TensorFlow is imported
+            os.environ["TF_NUM_INTRAOP_THREADS"] = str(self.threads)
+            os.environ["TF_NUM_INTEROP_THREADS"] = "1"
+        import tensorflow as tf
+        from tensorflow.keras.models import Sequential
+        from tensorflow.keras.layers import Flatten, Dense
+
+        if self.threads:
+            try:
+                tf.config.threading.set_intra_op_parallelism_threads(self.threads)
+                tf.config.threading.set_inter_op_parallelism_threads(1)
+            except RuntimeError:
+                pass  # Already set by an earlier run of this worker
+
+        tf.keras.utils.set_random_seed(self.seed)
+        self.model = Sequential()
+        self.model.add(Flatten())
+        self.model.add(Dense(128, activation="relu"))
+        self.model.add(Dense(10, activation="softmax"))
+        self.model.compile(optimizer="adam", loss="sparse_categorical_crossentropy", metrics=["accuracy"])
+        self.model.fit(X, y, epochs=self.epochs, verbose=0)
+        return self
+
+    def predict(self, X):
+        return np.argmax(self.model(np.asarray(X, dtype=np.float32), training=False).numpy(), axis=1)
+
+
+MODELS = {
+    "decision_tree": lambda seed, epochs, threads: DecisionTreeClassifier(random_state=seed),
+    "linear_svc": lambda seed, epochs, threads: svm.SVC(kernel="linear", C=1.0),
+    "keras_dense": lambda seed, epochs, threads: KerasDense(seed, epochs, threads),
+}
+
+
+def run_one(model_name, feature_set, seed, epochs=40, threads=None):
+    """
+    Train and measure one model on one split.
+
+    Parameters:
+    - model_name (str): Key of MODELS.
+    - feature_set (str): Key of FEATURE_SETS.
+    - seed (int): Seed of the split and of the model.
+    - epochs (int): Training epochs of the Keras model.
+    - threads (int): Threads the run may use for BLAS and TensorFlow (None - no limit).
+
+    Returns:
+    dict: One run of the report.
+    """
+    with threadpool_limits(threads):
+        return _measure(model_name, feature_set, seed, epochs, threads)
+
+
+def _measure(model_name, feature_set, seed, epochs, threads):
+    """Train and measure one model, see run_one."""
+    wine = datasets.load_wine()
+    X = wine.data[:, FEATURE_SETS[feature_set]]
+    X_train, X_test, y_train, y_test = train_test_split(X, wine.target, test_size=0.3, random_state=seed, stratify=wine.target)
+
+    model = MODELS[model_name](seed, epochs, threads)
+    start = time.perf_counter()
+    model.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - start
+
+    accuracy = accuracy_score(y_test, model.predict(X_test))
+
+    latencies = np.empty(LATENCY_SAMPLES)
+    for index in range(LATENCY_SAMPLES):
+        sample = X_test[index % len(X_test)][np.newaxis]
+        start = time.perf_counter()
+        model.predict(sample)
+        latencies[index] = time.perf_counter() - start
+
+    batch = np.tile(X_test, (-(-THROUGHPUT_ROWS // len(X_test)), 1))[:THROUGHPUT_ROWS]
+    start = time.perf_counter()
+    model.predict(batch)
+    throughput = len(batch) / (time.perf_counter() - start)
+
+    return {
+        "model": model_name,
+        "features": feature_set,
+        "seed": seed,
+        "fit_seconds": fit_seconds,
+        "latency_p50_ms": float(np.percentile(latencies, 50) * 1000),
+        "latency_p99_ms": float(np.percentile(latencies, 99) * 1000),
+        "throughput": throughput,
+        "accuracy": float(accuracy),
+    }
+
+
+def summarize(runs):
+    """
+    Group the runs by model and feature subset.
+
+    Parameters:
+    - runs (list): Runs returned by run_one.
+
+    Returns:
+    list: One dict per (model, features) with the aggregated metrics.
+    """
+    groups = {}
+    for run in runs:
+        groups.setdefault((run["model"], run["features"]), []).append(run)
+
+    summary = []
+    for (model_name, feature_set), group in groups.items():
+        metric = lambda name: np.array([run[name] for run in group])
+        summary.append({
+            "model": model_name,
+            "features": feature_set,
+            "runs": len(group),
+            "accuracy_mean": float(metric("accuracy").mean()),
+            "accuracy_std": float(metric("accuracy").std()),
+            "fit_seconds_median": float(np.median(metric("fit_seconds"))),
+            "latency_p50_ms_median": float(np.median(metric("latency_p50_ms"))),
+            "latency_p99_ms_median": float(np.median(metric("latency_p99_ms"))),
+            "throughput_median": float(np.median(metric("throughput"))),
+        })
+    return summary
+
+
+def run_benchmark(models, feature_sets, seeds, jobs=-1, epochs=40):
+    """
+    Run every model on every feature subset and seed in parallel.
+
+    Parameters:
+    - models (list): Keys of MODELS.
+    - feature_sets (list): Keys of FEATURE_SETS.
+    - seeds (list): Seeds of the splits.
+    - jobs (int): Number of joblib workers (-1 - one per CPU).
+    - epochs (int): Training epochs of the Keras model.
+
+    Returns:
+    dict: The report with config, runs and summary.
+    """
+    tasks = [(model, features, seed) for model in models for features in feature_sets for seed in seeds]
+    workers = max(1, min(len(tasks), os.cpu_count() + 1 + jobs if jobs < 0 else jobs))  # joblib counts -1 as all CPUs
+    threads = max(1, os.cpu_count() // workers)
+    runs = Parallel(n_jobs=workers)(delayed(run_one)(model, features, seed, epochs, threads) for model, features, seed in tasks)
+    return {
+        "config": {"models": models, "features": feature_sets, "seeds": list(seeds), "epochs": epochs,
+                   "workers": workers, "threads_per_worker": threads,
+                   "latency_samples": LATENCY_SAMPLES, "throughput_rows": THROUGHPUT_ROWS},
+        "runs": runs,
+        "summary": summarize(runs),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the wine classifiers.")
+    parser.add_argument("--models", nargs="+", choices=list(MODELS), default=list(MODELS))
+    parser.add_argument("--features", nargs="+", choices=list(FEATURE_SETS), default=list(FEATURE_SETS))
+    parser.add_argument("--seeds", type=int, default=5, help="Number of seeded splits")
+    parser.add_argument("--jobs", type=int, default=-1, help="Number of workers (-1 - one per CPU)")
+    parser.add_argument("--epochs", type=int, default=40)
+    parser.add_argument("--output", default="wine_benchmark.json")
+    args = parser.parse_args()
+
+    report = run_benchmark(args.models, args.features, range(args.seeds), args.jobs, args.epochs)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    for row in report["summary"]:
+        print(f"{row['model']:>14} {row['features']:>18}: accuracy {row['accuracy_mean']:.3f} ± {row['accuracy_std']:.3f}, "
+              f"fit {row['fit_seconds_median'] * 1000:.1f} ms, p50 {row['latency_p50_ms_median']:.3f} ms, "
+              f"p99 {row['latency_p99_ms_median']:.3f} ms, {row['throughput_median']:.0f} samples/s")
+    print(f"Report saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()